@@ -0,0 +1,233 @@
+"""Network clients shared by everything running in one process.
+
+get_clients() builds them once per process: a pooled keep-alive requests session for
+ygoprodeck (card data and art), and the OpenAI and ElevenLabs clients. Every call goes
+through call_with_retries: exponential backoff with full jitter on 429/5xx and connection
+errors, honouring Retry-After, behind a per-service rate limiter that halves its rate on
+429 and creeps back up on success. Retries are counted on the current tracing span.
+
+Point YGO_SECRETS at another secrets file, and set openai_base_url in it, to run against
+the local stub servers in stub_services.py.
+"""
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import current_span
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+SECRETS_PATH = os.path.join('src', 'modules', 'secrets.json')
+SECRETS_ENV = "YGO_SECRETS"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+if httpx is not None:
+    TRANSIENT_ERRORS += (httpx.TransportError,)
+
+# requests per second each service starts at; ygoprodeck allows 20 per second
+SERVICE_RATES = {
+    "ygoprodeck": 15.0,
+    "openai": 20.0,
+    "elevenlabs": 5.0,
+}
+
+
+class AdaptiveRateLimiter:
+    """Spaces out calls to one service. Starts at `rate` calls per second, halves it on every
+    429 (and waits out its Retry-After) and adds `recover` (a tenth of the start rate by
+    default) back per success, up to the start rate."""
+
+    def __init__(self, rate=10.0, min_rate=0.2, recover=None):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.recover = recover or rate / 10
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def throttled(self, retry_after=None):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.next_time = max(self.next_time, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.recover)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(service):
+    """The process-wide limiter of a service (or host)"""
+    with _limiters_lock:
+        if service not in _limiters:
+            _limiters[service] = AdaptiveRateLimiter(SERVICE_RATES.get(service, 10.0))
+        return _limiters[service]
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter, so retrying workers don't stampede together"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def status_of(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_of(error):
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error):
+    if status_of(error) in RETRY_STATUSES:
+        return True
+    # the OpenAI SDK wraps httpx transport errors in its own types
+    return isinstance(error, TRANSIENT_ERRORS) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def call_with_retries(func, *args, limiter=None, max_retries=4, **kwargs):
+    """func(*args, **kwargs), retried on transient failures with jittered exponential backoff"""
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.wait()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_transient(e):
+                raise
+            retry_after = retry_after_of(e)
+            if status_of(e) == 429 and limiter:
+                limiter.throttled(retry_after)
+            current_span().add("retries")
+            time.sleep(max(backoff_delay(attempt), retry_after or 0))
+            continue
+        if limiter:
+            limiter.succeeded()
+        return result
+
+
+class RetryableStatus(requests.HTTPError):
+    """A 429/5xx response, raised so call_with_retries retries it"""
+
+
+class HttpClient:
+    """requests with a keep-alive connection pool, default timeouts, retries and a rate
+    limiter per host. Responses other than 429/5xx are returned as they are."""
+
+    def __init__(self, timeout=(5, 30), pool_size=16, max_retries=4):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).hostname or ""
+        service = "ygoprodeck" if host.endswith("ygoprodeck.com") else host
+
+        def attempt():
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatus(f"{response.status_code} from {url}", response=response)
+            return response
+
+        return call_with_retries(attempt, limiter=limiter_for(service), max_retries=self.max_retries)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+def load_secrets(path=None):
+    path = path or os.environ.get(SECRETS_ENV) or SECRETS_PATH
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+class Clients:
+    """One process' clients. The API clients are created on first use, so a process that
+    only downloads card art never needs the API keys."""
+
+    def __init__(self, secrets_path=None):
+        self.secrets_path = secrets_path
+        self.http = HttpClient()
+        self.lock = threading.Lock()
+        self._secrets = None
+        self._openai = None
+        self._elevenlabs = None
+
+    @property
+    def secrets(self):
+        with self.lock:
+            if self._secrets is None:
+                self._secrets = load_secrets(self.secrets_path)
+            return self._secrets
+
+    @property
+    def openai(self):
+        secrets = self.secrets
+        with self.lock:
+            if self._openai is None:
+                from openai import OpenAI
+
+                # retries are ours (call_with_retries), so the SDK doesn't retry underneath them
+                self._openai = OpenAI(api_key=secrets["openai_api_key"], base_url=secrets.get("openai_base_url"),
+                                      timeout=60, max_retries=0)
+            return self._openai
+
+    @property
+    def elevenlabs(self):
+        secrets = self.secrets
+        with self.lock:
+            if self._elevenlabs is None:
+                from elevenlabs.client import ElevenLabs
+
+                self._elevenlabs = ElevenLabs(api_key=secrets["elevenlabs_api_key"], timeout=120)
+            return self._elevenlabs
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_clients(secrets_path=None):
+    """This process' clients. Keyed by pid too, since pooled connections must not be shared
+    with a forked child."""
+    key = (os.getpid(), secrets_path)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = Clients(secrets_path)
+        return _clients[key]
+
+
+def http():
+    return get_clients().http
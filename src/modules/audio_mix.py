@@ -0,0 +1,173 @@
+import hashlib
+import math
+import os
+import subprocess
+import wave
+
+import numpy as np
+
+CACHE_DIR = os.path.join('src', 'cache', 'pcm')
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+MUSIC_DIR = os.path.join('src', 'assets', 'music')
+SFX_PATH = os.path.join('src', 'assets', 'sfx', 'sfx.mp3')
+
+# decoded beds kept for the life of the process, a worker decodes each music track at most once
+_pcm = {}
+
+
+def run_decoder(path, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """Decodes an audio file to a float32 (samples, channels) array with ffmpeg"""
+    command = [
+        'ffmpeg', '-v', 'error',
+        '-i', path,
+        '-f', 'f32le', '-acodec', 'pcm_f32le',
+        '-ac', str(channels), '-ar', str(sample_rate),
+        '-'
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise Exception(f"Error decoding {path}: {result.stderr.decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+def decode_pcm(path, sample_rate=SAMPLE_RATE, channels=CHANNELS, cache_dir=CACHE_DIR):
+    """Decodes a shared asset (a music bed or the SFX) to a float32 (samples, channels) array.
+
+    Results are cached on disk as .npy keyed by the file's contents, and memory-mapped
+    from there, so the music beds and SFX are decoded once rather than on every render.
+    Per-card audio goes through run_decoder instead: caching it would grow the disk cache
+    and every worker's memory with each card of a batch.
+    """
+    stat = os.stat(path)
+    memo_key = (path, stat.st_mtime, stat.st_size, sample_rate, channels)
+    if memo_key in _pcm:
+        return _pcm[memo_key]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{digest}_{sample_rate}_{channels}.npy")
+
+    if not os.path.isfile(cache_path):
+        samples = run_decoder(path, sample_rate, channels)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, samples)
+        os.replace(tmp_path, cache_path)
+
+    samples = np.load(cache_path, mmap_mode='r')
+    _pcm[memo_key] = samples
+    return samples
+
+
+def fit(samples, length):
+    """Trims or zero-pads samples to exactly length frames"""
+    if len(samples) >= length:
+        return samples[:length]
+    padded = np.zeros((length, samples.shape[1]), dtype=np.float32)
+    padded[:len(samples)] = samples
+    return padded
+
+
+def loop_to(samples, length):
+    """Repeats samples (a music bed) until it is exactly length frames long"""
+    if len(samples) >= length:
+        return samples[:length]
+    return np.resize(np.asarray(samples), (length, samples.shape[1]))
+
+
+def duck_envelope(narration, sample_rate=SAMPLE_RATE, duck_gain=0.4, threshold=0.02, window=0.05, release=0.3):
+    """Per-sample gain for the music: duck_gain while the narrator is speaking, 1.0 otherwise,
+    with the transitions smoothed out over `release` seconds."""
+    window_size = max(1, int(window * sample_rate))
+    frames = len(narration) // window_size + 1
+    padded = fit(narration, frames * window_size)
+
+    rms = np.sqrt(np.mean(np.square(padded).reshape(frames, window_size, -1), axis=(1, 2)))
+    gains = np.where(rms > threshold, duck_gain, 1.0).astype(np.float32)
+
+    smooth = max(1, int(release / window))
+    if smooth > 1:
+        kernel = np.ones(smooth, dtype=np.float32) / smooth
+        gains = np.convolve(np.pad(gains, (smooth // 2, smooth - 1 - smooth // 2), mode='edge'), kernel, mode='valid')
+
+    return np.repeat(gains, window_size)[:len(narration), None]
+
+
+def mix_card_audio(narration_path, music_path, output_path, sfx_path=SFX_PATH, music_gain=0.1, sfx_gain=0.7,
+                   duck_gain=None, sample_rate=SAMPLE_RATE):
+    """Mixes narration, music bed and SFX into one WAV as long as the narration and returns
+    its duration in seconds.
+
+    The whole mix is a handful of vectorized numpy operations over cached PCM, with
+    optional ducking of the music under the narration (duck_gain, e.g. 0.4).
+    """
+    narration = run_decoder(narration_path, sample_rate)
+    length = len(narration)
+
+    mix = np.array(narration, dtype=np.float32)
+
+    music = fit(decode_pcm(music_path, sample_rate), length)
+    if duck_gain is None:
+        mix += music * music_gain
+    else:
+        mix += music * (music_gain * duck_envelope(narration, sample_rate, duck_gain))
+
+    sfx = decode_pcm(sfx_path, sample_rate)[:length]
+    mix[:len(sfx)] += sfx * sfx_gain
+
+    np.clip(mix, -1.0, 1.0, out=mix)
+    write_wav(output_path, mix, sample_rate)
+    return length / sample_rate
+
+
+def mix_compilation_audio(narration_paths, music_path, output_path, sfx_path=SFX_PATH, music_gain=0.1, sfx_gain=0.7,
+                          duck_gain=None, pad=1.0, fps=30, sample_rate=SAMPLE_RATE):
+    """Mixes the narrations of several cards back to back over one looping music bed, with the
+    SFX at the start of every card, into one WAV. Returns the duration in seconds of each
+    card's segment: its narration plus pad, rounded up to whole video frames."""
+    narrations = [run_decoder(path, sample_rate) for path in narration_paths]
+    durations = [math.ceil((len(narration) / sample_rate + pad) * fps) / fps for narration in narrations]
+    starts = [round(sum(durations[:i]) * sample_rate) for i in range(len(durations))]
+    length = round(sum(durations) * sample_rate)
+
+    voice = np.zeros((length, CHANNELS), dtype=np.float32)
+    for start, narration in zip(starts, narrations):
+        voice[start:start + len(narration)] = narration[:length - start]
+
+    music = loop_to(decode_pcm(music_path, sample_rate), length)
+    if duck_gain is None:
+        mix = voice + music * music_gain
+    else:
+        mix = voice + music * (music_gain * duck_envelope(voice, sample_rate, duck_gain))
+
+    sfx = decode_pcm(sfx_path, sample_rate)
+    for start in starts:
+        end = min(length, start + len(sfx))
+        mix[start:end] += sfx[:end - start] * sfx_gain
+
+    np.clip(mix, -1.0, 1.0, out=mix)
+    write_wav(output_path, mix, sample_rate)
+    return durations
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    pcm16 = (samples * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm16.tobytes())
+
+
+def music_path(choice):
+    return os.path.join(MUSIC_DIR, f"{choice}.mp3")
+
+
+def preload(music_choices=range(1, 6)):
+    """Decodes the five music beds and the SFX up front"""
+    for choice in music_choices:
+        decode_pcm(music_path(choice))
+    decode_pcm(SFX_PATH)
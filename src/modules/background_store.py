@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import subprocess
+
+import numpy as np
+
+BACKGROUND_PATH = os.path.join('src', 'assets', 'background.mp4')
+STORE_DIR = os.path.join('src', 'cache', 'background')
+
+# stores already mapped in this process, so a worker rendering many cards hashes and maps the asset once
+_open_stores = {}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """sha256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BackgroundStore:
+    """Pre-decoded background frames, memory-mapped read-only so every worker shares the same pages.
+
+    Frames are stored as raw rgb24 at output resolution. Lookups wrap around, so a short
+    background loops for as long as the narration runs.
+    """
+
+    def __init__(self, raw_path, meta):
+        self.raw_path = raw_path
+        self.meta = meta
+        self.fps = meta["fps"]
+        self.size = tuple(meta["size"])
+        self.frame_count = meta["frames"]
+        width, height = self.size
+        self.frames = np.memmap(raw_path, dtype=np.uint8, mode='r', shape=(self.frame_count, height, width, 3))
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps
+
+    def frame_index(self, t):
+        return int(t * self.fps + 1e-6) % self.frame_count
+
+    def get_frame(self, t):
+        return self.frames[self.frame_index(t)]
+
+    @classmethod
+    def open(cls, source=BACKGROUND_PATH, size=(1920, 1080), fps=30, store_dir=STORE_DIR):
+        """Opens the store for source, decoding it first if it is missing or the asset changed."""
+        key = (source, tuple(size), fps, store_dir)
+        if key in _open_stores:
+            return _open_stores[key]
+
+        raw_path, meta_path = store_paths(source, size, fps, store_dir)
+        source_hash = file_hash(source)
+
+        meta = None
+        if os.path.isfile(meta_path) and os.path.isfile(raw_path):
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            if meta.get("source_hash") != source_hash:
+                meta = None
+
+        if meta is None:
+            meta = build_background_store(source, size, fps, store_dir, source_hash)
+
+        store = cls(raw_path, meta)
+        _open_stores[key] = store
+        return store
+
+
+def store_paths(source, size, fps, store_dir=STORE_DIR):
+    name = os.path.splitext(os.path.basename(source))[0]
+    base = os.path.join(store_dir, f"{name}_{size[0]}x{size[1]}_{fps}")
+    return base + ".raw", base + ".json"
+
+
+def build_background_store(source=BACKGROUND_PATH, size=(1920, 1080), fps=30, store_dir=STORE_DIR, source_hash=None):
+    """Decodes source once into a raw frame file at the given size and fps and returns its metadata."""
+    os.makedirs(store_dir, exist_ok=True)
+    raw_path, meta_path = store_paths(source, size, fps, store_dir)
+    width, height = size
+    tmp_raw = f"{raw_path}.{os.getpid()}.tmp"
+
+    print(f"🔃 Decoding {source} into background frame store")
+    command = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-i', source,
+        '-an',
+        # scale to cover the target and center crop, so a vertical store crops the landscape asset
+        '-vf', f'scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},fps={fps}',
+        '-pix_fmt', 'rgb24',
+        '-f', 'rawvideo',
+        tmp_raw
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(tmp_raw):
+            os.remove(tmp_raw)
+        raise Exception(f"Error decoding background {source}: {result.stderr}")
+
+    frame_bytes = width * height * 3
+    frames = os.path.getsize(tmp_raw) // frame_bytes
+    if frames < 1:
+        os.remove(tmp_raw)
+        raise Exception(f"Error, no frames decoded from {source}")
+
+    meta = {
+        "source": source,
+        "source_hash": source_hash or file_hash(source),
+        "size": [width, height],
+        "fps": fps,
+        "frames": frames,
+    }
+
+    # replace atomically so workers never map a half-written store
+    os.replace(tmp_raw, raw_path)
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta, 'w') as file:
+        json.dump(meta, file, indent=2)
+    os.replace(tmp_meta, meta_path)
+
+    print(f"✅ Background frame store ready: {frames} frames at {width}x{height}")
+    return meta
+
+
+def clear_stores(store_dir=STORE_DIR):
+    """Forgets the stores mapped in this process and deletes the decoded frames, so the next
+    open decodes from scratch"""
+    _open_stores.clear()
+    if not os.path.isdir(store_dir):
+        return
+    for name in os.listdir(store_dir):
+        os.remove(os.path.join(store_dir, name))
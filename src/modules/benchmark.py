@@ -0,0 +1,290 @@
+"""Offline benchmark of the render path.
+
+Runs without network or GPU: the card art, narration, music and background are all
+synthetic, and nothing talks to OpenAI or ElevenLabs. The single runs go through
+YugiohVideoMaker.create_video and the batch runs through pipeline.run_pipeline with
+StubServices (and mass_shorts_maker for converted Shorts), so what is timed is the real
+render path. Every stage is timed from the spans it records and each configuration is
+written as one JSON line, so runs before and after a change to the render path can be
+compared directly.
+
+    python src/modules/benchmark.py --duration 10 --cards 4 --output bench.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import mass_shorts_maker
+import tracing
+from background_store import BackgroundStore, clear_stores
+from dual_render import SHORT_SIZE
+from image_cache import CACHE_DIR, cache_paths
+from mass_shorts_maker import convert_to_short, process_videos
+from pipeline import run_pipeline
+from raw_render import LANDSCAPE_SIZE, FrameTimings
+from stub_services import StubServices, stub_card
+from tracing import span
+from yugioh_video_maker import YugiohVideoMaker
+
+# entry points and render modules whose cold import time is reported
+IMPORT_MODULES = ["mass_shorts_maker", "mass_video_maker", "yugioh_video_maker", "pipeline", "raw_render", "worker_pool"]
+
+# the render path always runs at 30 fps
+FPS = 30
+# every benchmark card shares this art, written into the image cache by make_assets
+CARD_URL = "bench://cards/card.jpg"
+
+
+def peak_rss_mb(children=False):
+    """Peak resident memory of this process (or of its finished children, e.g. ffmpeg)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return round(usage.ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', *args], check=True, capture_output=True)
+
+
+def import_seconds(module):
+    """Cold import time of a module, in a fresh interpreter so nothing is loaded yet. None if
+    it can't be imported here (e.g. a missing optional dependency)."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return None
+    return round(float(result.stdout), 4)
+
+
+def bench_imports(modules=IMPORT_MODULES, workers=2):
+    """Cold import times plus how long a warm render pool takes to start"""
+    from worker_pool import warm_pool
+
+    import_times = {module: import_seconds(module) for module in modules}
+    with warm_pool(workers, initargs=(FPS, False)) as executor:
+        warm_seconds = executor.warm_seconds
+        worker_seconds = max(warmup.get("seconds", 0) for warmup in executor.warmup.values())
+    return {"import_seconds": import_times, "pool_warm_seconds": warm_seconds, "worker_warm_seconds": worker_seconds}
+
+
+def make_assets(workdir, duration):
+    """Writes the synthetic assets into workdir, laid out like the repo's src/assets, and the
+    card art into its image cache"""
+    assets = os.path.join(workdir, 'src', 'assets')
+    os.makedirs(os.path.join(assets, 'music'), exist_ok=True)
+    os.makedirs(os.path.join(assets, 'sfx'), exist_ok=True)
+    os.makedirs(os.path.join(workdir, 'src', 'videos'), exist_ok=True)
+
+    # a moving 10 second background, looped by the frame store like the real one
+    ffmpeg('-f', 'lavfi', '-i', 'testsrc2=size=1920x1080:rate=30:duration=10', '-pix_fmt', 'yuv420p',
+           os.path.join(assets, 'background.mp4'))
+    for choice in range(1, 6):
+        ffmpeg('-f', 'lavfi', '-i', f'sine=frequency={220 + 110 * choice}:duration=60', '-b:a', '128k',
+               os.path.join(assets, 'music', f'{choice}.mp3'))
+    ffmpeg('-f', 'lavfi', '-i', 'sine=frequency=880:duration=1', '-b:a', '128k', os.path.join(assets, 'sfx', 'sfx.mp3'))
+    ffmpeg('-f', 'lavfi', '-i', f'sine=frequency=220:duration={duration}', '-b:a', '128k', os.path.join(workdir, 'narration.mp3'))
+
+    # a ygoprodeck-sized card with some detail so the encoder has work to do, cached the way
+    # get_card_image leaves a downloaded card, so neither the maker nor StubServices fetches it
+    rng = np.random.default_rng(0)
+    card_img = rng.integers(0, 255, (614, 421, 3), dtype=np.uint8)
+    _, array_path = cache_paths(CARD_URL, os.path.join(workdir, CACHE_DIR))
+    os.makedirs(os.path.dirname(array_path), exist_ok=True)
+    np.save(array_path, card_img)
+
+
+def bench_card(index, name=None):
+    """A stub_services card with the benchmark's card art"""
+    card = dict(stub_card(index), card_images=[{"image_url": CARD_URL}])
+    if name:
+        card["name"] = name
+    return card
+
+
+def stage_summary(started):
+    """Seconds per traced stage since started, with the render split into the steps of its frame
+    loop (see raw_render.FrameTimings), and the frames rendered (30 per second of mixed audio)"""
+    records = tracing.get_tracer().records(since=started)
+    stages = {stage: row["total"] for stage, row in tracing.summarize(records)["stages"].items()}
+    for step in FrameTimings.STEPS:
+        stages[step] = round(sum(record.get(f"{step}_seconds", 0.0) for record in records
+                                 if record["stage"] == "render"), 4)
+    frames = sum(int(record["duration"] * FPS) for record in records
+                 if record["stage"] == "audio_mix" and record["status"] == "ok")
+    return stages, frames
+
+
+def bench_video(workdir, profile="fast", short_mode="none", name="bench"):
+    """Renders one synthetic card with YugiohVideoMaker.create_video, as yugioh_video_maker does.
+    short_mode is "none", "convert" (encode, then crop a Short from the file) or "dual" (both
+    layouts in one pass). Needs tracing configured, the stage breakdown comes from its spans."""
+    started = time.time()
+    start = time.perf_counter()
+    card = bench_card(0, name)
+
+    with span("fetch", name):
+        video_maker = YugiohVideoMaker(
+            card_name=card["name"],
+            card_effect=card["desc"],
+            card_readable_type=card["humanReadableCardType"],
+            card_img=CARD_URL,
+            card_type=card["type"],
+            card_id=card["id"],
+            bg_audio=1,
+            reuse_audio="reuse",
+            match_policy="reject"
+        )
+
+    with span("background_decode", name):
+        BackgroundStore.open(size=LANDSCAPE_SIZE, fps=FPS)
+        if short_mode == "dual":
+            BackgroundStore.open(size=SHORT_SIZE, fps=FPS)
+
+    # the synthetic narration stands in for the I/O stage's, so no TTS client is involved
+    narration_path = os.path.join(workdir, 'narration.mp3')
+    short_dir = os.path.join('src', 'shorts')
+    if short_mode == "dual":
+        video_path, short_path = video_maker.create_video(with_short=True, short_dir=short_dir, encoder_profile=profile,
+                                                          narration_path=narration_path)
+    else:
+        video_path = video_maker.create_video(encoder_profile=profile, narration_path=narration_path)
+
+    if short_mode == "convert":
+        os.makedirs(short_dir, exist_ok=True)
+        short_path = os.path.join(short_dir, f"{name}_short.mp4")
+        if not convert_to_short(video_path, short_path, encoder_profile=profile):
+            raise Exception(f"Error converting {video_path} to a short")
+
+    wall = time.perf_counter() - start
+    stages, frames = stage_summary(started)
+    return {
+        "frames": frames,
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2),
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_child_rss_mb": peak_rss_mb(children=True),
+    }
+
+
+def bench_batch(workdir, cards, workers, duration, short_mode="none"):
+    """Renders `cards` synthetic cards through pipeline.run_pipeline with StubServices on
+    `workers` render processes, as mass_video_maker does; with short_mode="convert" the Shorts
+    are then made by mass_shorts_maker.process_videos, as create_shorts does in two passes.
+    The pipeline renders with create_video's default encoder profile."""
+    started = time.time()
+    start = time.perf_counter()
+    batch = [bench_card(i) for i in range(cards)]
+
+    # narration about `duration` seconds long: every stub script has the same number of words
+    words = len(StubServices().get_script(batch[0]).split())
+    services = StubServices(words_per_second=words / duration)
+
+    # the parent builds the shared frame stores once, as create_videos does
+    with span("background_decode"):
+        BackgroundStore.open(size=LANDSCAPE_SIZE, fps=FPS)
+        if short_mode == "dual":
+            BackgroundStore.open(size=SHORT_SIZE, fps=FPS)
+
+    short_dir = tempfile.mkdtemp(prefix=f"shorts_{short_mode}_", dir=workdir)
+    results = run_pipeline(batch, services, render_processes=workers, with_short=short_mode == "dual",
+                           short_dir=short_dir)
+    failed = [result for result in results if not result[0]]
+    if failed:
+        raise Exception(f"{len(failed)} of {cards} benchmark cards failed to render, first: {failed[0][3]}")
+
+    if short_mode == "convert":
+        # the Shorts go to the fresh short_dir instead of the shared drive, so none is skipped as existing
+        mass_shorts_maker.SHORTS_DIR = mass_shorts_maker.POSTED_SHORTS_DIR = short_dir
+        if not process_videos([video_path for _, video_path, _, _ in results], jobs=workers, assume_yes=True):
+            raise Exception("Error converting the benchmark videos to shorts")
+
+    wall = time.perf_counter() - start
+    stages, frames = stage_summary(started)
+    return {
+        "cards": cards,
+        "workers": workers,
+        "frames": frames,
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2),
+        "cards_per_min": round(cards / wall * 60, 2),
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(children=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline render benchmark")
+    parser.add_argument("--duration", type=float, default=10, help="narration length in seconds")
+    parser.add_argument("--profile", default="fast", help="encoder profile of the single runs (see encoders.PROFILES)")
+    parser.add_argument("--cards", type=int, default=4, help="videos in the batch run, 0 to skip it")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--short-modes", default="none,convert,dual", help="comma separated: none, convert, dual")
+    parser.add_argument("--workdir", help="keep the synthetic assets and outputs here")
+    parser.add_argument("--output", help="append results to this JSON Lines file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="ygo_bench_"))
+    os.makedirs(workdir, exist_ok=True)
+    # every module resolves src/... against the working directory, so run inside workdir
+    os.chdir(workdir)
+
+    print(f"🔃 Writing synthetic assets to {workdir}")
+    make_assets(workdir, args.duration)
+    # the per-stage breakdown is read back from the spans the render path records
+    tracing.configure(os.path.join(workdir, 'trace.jsonl'))
+
+    common = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "profile": args.profile,
+        "duration": args.duration,
+        "target_fps": FPS,
+    }
+
+    results = []
+    result = bench_imports(workers=min(args.workers, 2))
+    results.append(dict(common, config="imports", **result))
+    print(f"✅ imports: {result['import_seconds']}, warm pool in {result['pool_warm_seconds']}s")
+
+    for short_mode in args.short_modes.split(","):
+        # drop the stores so the single run measures a cold background decode
+        clear_stores()
+
+        result = bench_video(workdir, args.profile, short_mode, name=f"single_{short_mode}")
+        results.append(dict(common, config="single", short_mode=short_mode, **result))
+        print(f"✅ single/{short_mode}: {result['fps']} fps, {result['wall_seconds']}s")
+
+        if args.cards:
+            result = bench_batch(workdir, args.cards, args.workers, args.duration, short_mode)
+            results.append(dict(common, config="batch", short_mode=short_mode, **result))
+            print(f"✅ batch/{short_mode}: {result['cards_per_min']} cards/min, {result['fps']} fps")
+
+    lines = "".join(json.dumps(result) + "\n" for result in results)
+    if output:
+        with open(output, 'a') as file:
+            file.write(lines)
+        print(f"✅ Results appended to {output}")
+    else:
+        sys.stdout.write(lines)
+
+
+if __name__ == "__main__":
+    main()
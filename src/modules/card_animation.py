@@ -0,0 +1,104 @@
+import math
+from collections import OrderedDict
+
+import cv2
+
+
+def card_scale_at(t, T, rotation_start=90, rotation_end=0, flip_axis='x', flip_duration_ratio=0.03, start_scale=0.4, end_scale=0.7):
+    """Returns (scale_x, scale_y, angle) of the card at time t for the flip-then-zoom animation.
+
+    angle is only meaningful for flip_axis == 'z' (in-plane rotation), otherwise it is None.
+    """
+    T_flip = T * flip_duration_ratio  # duration over which the flip happens
+
+    if t <= T_flip:
+        # Flip phase: apply a flip transformation only, zoom stays fixed at start_scale.
+        fraction = t / T_flip if T_flip > 0 else 1.0  # goes from 0 to 1 during the flip phase
+        angle = rotation_start + fraction * (rotation_end - rotation_start)
+        rad = math.radians(angle)
+        if flip_axis == 'x':
+            # Flip about the x-axis by scaling the height by |cos(angle)|
+            return start_scale, start_scale * abs(math.cos(rad)), None
+        elif flip_axis == 'z':
+            # For a 2D in-plane rotation, we will perform a full rotation transformation.
+            return start_scale, start_scale, angle
+        else:
+            # Simulate a flip about the y-axis (also the default) by scaling the width by |cos(angle)|
+            return start_scale * abs(math.cos(rad)), start_scale, None
+
+    # Zoom phase: the flip is complete, scale linearly from start_scale to end_scale over T_flip..T.
+    fraction_zoom = (t - T_flip) / (T - T_flip) if (T - T_flip) > 0 else 1.0
+    zoom_factor = start_scale + fraction_zoom * (end_scale - start_scale)
+    return zoom_factor, zoom_factor, None
+
+
+class CardFrameCache:
+    """LRU cache of resized copies of a static card image, keyed by output size.
+
+    A still image zooming over 20-30 seconds lands on the same integer width/height for
+    many consecutive frames, so each size is only resized once. Resizes start from the
+    smallest level of a 2x image pyramid that is still at least as large as the target,
+    which keeps large downscales cheap without losing quality.
+    """
+
+    def __init__(self, image, max_entries=256):
+        self.image = image
+        self.max_entries = max_entries
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # levels[0] is the original image, each following level is half the size of the previous
+        self.levels = [image]
+        while min(self.levels[-1].shape[:2]) >= 64:
+            level = self.levels[-1]
+            self.levels.append(cv2.resize(level, (level.shape[1] // 2, level.shape[0] // 2), interpolation=cv2.INTER_AREA))
+
+    @property
+    def width(self):
+        return self.image.shape[1]
+
+    @property
+    def height(self):
+        return self.image.shape[0]
+
+    def size_for(self, scale_x, scale_y):
+        return max(int(self.width * scale_x), 1), max(int(self.height * scale_y), 1)
+
+    def get(self, width, height, angle=None):
+        key = (width, height, None if angle is None else round(angle, 1))
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = self._render(width, height, key[2])
+        frame.flags.writeable = False  # shared between frames, nobody may draw on it
+        self.frames[key] = frame
+        if len(self.frames) > self.max_entries:
+            self.frames.popitem(last=False)
+        return frame
+
+    def get_scaled(self, scale_x, scale_y, angle=None):
+        width, height = self.size_for(scale_x, scale_y)
+        return self.get(width, height, angle)
+
+    def _render(self, width, height, angle):
+        source = self.levels[0]
+        for level in self.levels[1:]:
+            if level.shape[1] < width or level.shape[0] < height:
+                break
+            source = level
+
+        if (source.shape[1], source.shape[0]) == (width, height):
+            resized = source.copy()
+        else:
+            resized = cv2.resize(source, (width, height), interpolation=cv2.INTER_LINEAR)
+
+        if angle is not None:
+            center = (width // 2, height // 2)
+            M = cv2.getRotationMatrix2D(center, angle, 1.0)
+            resized = cv2.warpAffine(resized, M, (width, height))
+        return resized
@@ -0,0 +1,253 @@
+import difflib
+import json
+import os
+import re
+import sqlite3
+from urllib.parse import parse_qs
+
+from api_clients import http
+
+DB_PATH = os.path.join('src', 'cache', 'cards.sqlite')
+CARDINFO_URL = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
+
+SCHEMA = """
+CREATE TABLE cards (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    norm_name TEXT NOT NULL,
+    type TEXT,
+    frame_type TEXT,
+    race TEXT,
+    attribute TEXT,
+    archetype TEXT,
+    level INTEGER,
+    atk INTEGER,
+    def INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX cards_name ON cards (name COLLATE NOCASE);
+CREATE INDEX cards_norm_name ON cards (norm_name);
+CREATE INDEX cards_type ON cards (type COLLATE NOCASE);
+CREATE INDEX cards_race ON cards (race COLLATE NOCASE);
+CREATE INDEX cards_attribute ON cards (attribute COLLATE NOCASE);
+CREATE INDEX cards_archetype ON cards (archetype COLLATE NOCASE);
+"""
+
+# cardinfo.php filters on these columns, comparisons are case-insensitive
+TEXT_FILTERS = {"type": "type", "race": "race", "attribute": "attribute", "archetype": "archetype", "frameType": "frame_type"}
+# numeric filters accept an lt/lte/gt/gte prefix, e.g. atk=gte2500
+NUMBER_FILTERS = {"level": "level", "atk": "atk", "def": "def", "id": "id", "link": "json_extract(data, '$.linkval')",
+                  "scale": "json_extract(data, '$.scale')"}
+NUMBER_OPERATORS = [("lte", "<="), ("gte", ">="), ("lt", "<"), ("gt", ">")]
+# the API's atk=? / def=? for "?" stats, which the snapshot stores as -1
+UNKNOWN_STAT = -1
+# banlist=tcg matches every card with a status (Banned, Limited, Semi-Limited) on that list
+BANLISTS = {"tcg": "ban_tcg", "ocg": "ban_ocg", "goat": "ban_goat"}
+SORT_COLUMNS = {"name": "name COLLATE NOCASE", "atk": "atk DESC", "def": "def DESC", "level": "level DESC", "id": "id",
+                "new": "id DESC", "type": "type COLLATE NOCASE, name COLLATE NOCASE"}
+# handled separately from the filters above
+OTHER_PARAMS = {"name", "fname", "desc", "cardset", "banlist", "linkmarker", "sort", "num", "offset"}
+
+
+class UnsupportedQuery(ValueError):
+    """A cardinfo.php query the local store can't answer exactly, e.g. format=, which needs
+    data the snapshot doesn't have. The API has to answer it instead."""
+
+
+def normalize_name(name):
+    """Lowercases and drops everything but letters and digits, so "Danger!? Tsuchinoko?" and
+    "danger tsuchinoko" match."""
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+
+def build_card_db(snapshot=None, db_path=DB_PATH):
+    """Builds the local card store from a cardinfo.php snapshot file, or downloads a fresh one."""
+    if snapshot is None:
+        print(f"🔃 Downloading card snapshot from {CARDINFO_URL}")
+        cards = http().get(CARDINFO_URL, timeout=(5, 120)).json()["data"]
+    else:
+        with open(snapshot, 'r', encoding='utf-8') as file:
+            cards = json.load(file)["data"]
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((
+                card["id"], card["name"], normalize_name(card["name"]), card.get("type"), card.get("frameType"),
+                card.get("race"), card.get("attribute"), card.get("archetype"), card.get("level"),
+                card.get("atk"), card.get("def"), json.dumps(card, separators=(',', ':'))
+            ) for card in cards)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    # replace atomically so readers never open a half-built store
+    os.replace(tmp_path, db_path)
+    print(f"✅ Local card database built with {len(cards)} cards")
+    return db_path
+
+
+class CardDB:
+    """Read-only lookups against the local card store. Every result is the same card dict
+    cardinfo.php returns."""
+
+    def __init__(self, db_path=DB_PATH):
+        if not os.path.isfile(db_path):
+            raise Exception(f"Error, no local card database at {db_path}. Run card_db.py to build it")
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        self._names = None
+
+    @staticmethod
+    def available(db_path=DB_PATH):
+        return os.path.isfile(db_path)
+
+    def close(self):
+        self.conn.close()
+
+    def _cards(self, sql, params=()):
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def exact(self, name):
+        """Exact name match, ignoring case, then ignoring punctuation and spacing"""
+        cards = self._cards("SELECT data FROM cards WHERE name = ? COLLATE NOCASE LIMIT 1", (name,))
+        if not cards:
+            cards = self._cards("SELECT data FROM cards WHERE norm_name = ? LIMIT 1", (normalize_name(name),))
+        return cards[0] if cards else None
+
+    def search(self, text, limit=20):
+        """Prefix matches first, then names that contain text anywhere (like cardinfo.php's fname)"""
+        norm = normalize_name(text)
+        if not norm:
+            return []
+        return self._cards(
+            "SELECT data FROM cards WHERE norm_name LIKE ? ORDER BY norm_name NOT LIKE ?, length(name), name LIMIT ?",
+            (f"%{norm}%", f"{norm}%", limit)
+        )
+
+    def fuzzy(self, name, limit=5, cutoff=0.6):
+        """Closest names for a misspelled card name"""
+        if self._names is None:
+            self._names = {norm: card_id for card_id, norm in self.conn.execute("SELECT id, norm_name FROM cards")}
+        matches = difflib.get_close_matches(normalize_name(name), list(self._names), n=limit, cutoff=cutoff)
+        return [self.by_id(self._names[match]) for match in matches]
+
+    def by_id(self, card_id):
+        cards = self._cards("SELECT data FROM cards WHERE id = ?", (card_id,))
+        return cards[0] if cards else None
+
+    def random(self):
+        cards = self._cards("SELECT data FROM cards ORDER BY random() LIMIT 1")
+        return cards[0] if cards else None
+
+    @staticmethod
+    def supports(query_string):
+        """Whether query can be answered locally, see translate_query"""
+        try:
+            translate_query(query_string)
+            return True
+        except UnsupportedQuery:
+            return False
+
+    def query(self, query_string):
+        """Runs a cardinfo.php query string (as produced by strip_ygoprodeck_url) locally.
+        Raises UnsupportedQuery for one that only the API can answer."""
+        sql, params = translate_query(query_string)
+        return self._cards(sql, params)
+
+
+def integer(param, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise UnsupportedQuery(f"{param}={value} is not a number") from None
+
+
+def translate_query(query_string):
+    """Translates cardinfo.php query parameters into a SELECT over the local store.
+
+    Supports name, fname, desc, id, type, race, attribute, archetype, frameType, cardset,
+    banlist, linkmarker (one marker), level, atk, def, link, scale (with lt/lte/gt/gte
+    prefixes, and ? for atk and def), sort, num and offset. Comma separated values match
+    any of them, like the API. Any other parameter raises UnsupportedQuery rather than
+    being dropped, which would widen the search.
+    """
+    query = {k: v[-1] for k, v in parse_qs(query_string).items()}
+    unsupported = sorted(set(query) - set(TEXT_FILTERS) - set(NUMBER_FILTERS) - OTHER_PARAMS)
+    if unsupported:
+        raise UnsupportedQuery(f"The local card database can't filter on {', '.join(unsupported)}")
+    where, params = [], []
+
+    if "name" in query:
+        names = query["name"].split("|")
+        where.append(f"name COLLATE NOCASE IN ({', '.join('?' * len(names))})")
+        params.extend(names)
+    if "fname" in query:
+        where.append("norm_name LIKE ?")
+        params.append(f"%{normalize_name(query['fname'])}%")
+    if "desc" in query:
+        where.append("json_extract(data, '$.desc') LIKE ?")
+        params.append(f"%{query['desc']}%")
+
+    if "cardset" in query:
+        where.append("EXISTS (SELECT 1 FROM json_each(data, '$.card_sets') "
+                     "WHERE json_extract(value, '$.set_name') = ? COLLATE NOCASE)")
+        params.append(query["cardset"])
+    if "banlist" in query:
+        banlist = BANLISTS.get(query["banlist"].lower())
+        if banlist is None:
+            raise UnsupportedQuery(f"Unknown banlist {query['banlist']}")
+        where.append(f"json_extract(data, '$.banlist_info.{banlist}') IS NOT NULL")
+    if "linkmarker" in query:
+        if "," in query["linkmarker"]:
+            raise UnsupportedQuery("The local card database only filters on one link marker")
+        where.append("EXISTS (SELECT 1 FROM json_each(data, '$.linkmarkers') WHERE value = ? COLLATE NOCASE)")
+        params.append(query["linkmarker"].strip())
+
+    for param, column in TEXT_FILTERS.items():
+        if param in query:
+            values = [value.strip() for value in query[param].split(",")]
+            where.append(f"{column} COLLATE NOCASE IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+    for param, column in NUMBER_FILTERS.items():
+        if param not in query:
+            continue
+        values = query[param].split(",")
+        clauses = []
+        for value in values:
+            operator = "="
+            for prefix, sql_operator in NUMBER_OPERATORS:
+                if value.startswith(prefix):
+                    operator, value = sql_operator, value[len(prefix):]
+                    break
+            clauses.append(f"{column} {operator} ?")
+            params.append(UNKNOWN_STAT if value == "?" and param in ("atk", "def") else integer(param, value))
+        where.append(f"({' OR '.join(clauses)})")
+
+    sql = "SELECT data FROM cards"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sort = query.get("sort", "name")
+    if sort not in SORT_COLUMNS:
+        raise UnsupportedQuery(f"Unknown sort {sort}")
+    sql += " ORDER BY " + SORT_COLUMNS[sort]
+
+    if "num" in query:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([integer("num", query["num"]), integer("offset", query.get("offset", 0))])
+
+    return sql, params
+
+
+if __name__ == "__main__":
+    import sys
+
+    build_card_db(sys.argv[1] if len(sys.argv) > 1 else None)
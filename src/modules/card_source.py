@@ -0,0 +1,72 @@
+from itertools import islice
+from urllib.parse import parse_qs, urlencode
+
+from api_clients import http
+from card_db import CardDB
+
+CARDINFO_URL = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
+
+
+def paged_query(query, page_size, offset):
+    params = {k: v for k, v in parse_qs(query).items() if k not in ("num", "offset")}
+    params["num"] = [str(page_size)]
+    params["offset"] = [str(offset)]
+    return urlencode(params, doseq=True)
+
+
+def no_match(response):
+    try:
+        error = response.json().get("error", "")
+    except ValueError:
+        return False
+    return "no card matching" in str(error).lower()
+
+
+def iter_card_pages(query, page_size=100, api_url=CARDINFO_URL, use_local=None):
+    """Yields the results of a cardinfo.php query one page (list of cards) at a time.
+
+    Pages come from the local card database when it exists and can answer the query (or
+    use_local is True) and from the API otherwise, following its num/offset paging until the
+    last page.
+    """
+    if use_local is None:
+        use_local = CardDB.available()
+        if use_local and not CardDB.supports(query):
+            print(f"⚠️ The local card database can't answer {query}, querying the API")
+            use_local = False
+
+    offset = 0
+    while True:
+        page_query = paged_query(query, page_size, offset)
+        if use_local:
+            # a connection per page: a lazy consumer (the pipeline's feeder) may pull every page
+            # on a different thread, and a sqlite3 connection only works on the thread that opened it
+            db = CardDB()
+            try:
+                cards = db.query(page_query)
+            finally:
+                db.close()
+            has_more = len(cards) == page_size
+        else:
+            response = http().get(f"{api_url}?{page_query}", timeout=(5, 60))
+            if response.status_code == 400 and (offset > 0 or no_match(response)):
+                # the API answers a search without results, and past-the-end pages, with
+                # "no card matching your query"
+                return
+            response.raise_for_status()
+            data = response.json()
+            cards = data.get("data", [])
+            meta = data.get("meta", {})
+            has_more = bool(meta.get("next_page")) if meta else len(cards) == page_size
+
+        if cards:
+            yield cards
+        if not has_more or not cards:
+            return
+        offset += len(cards)
+
+
+def iter_cards(query, page_size=100, max_cards=None, api_url=CARDINFO_URL, use_local=None):
+    """Yields cards one by one as their pages arrive, stopping after max_cards"""
+    cards = (card for page in iter_card_pages(query, page_size, api_url, use_local) for card in page)
+    return islice(cards, max_cards) if max_cards else cards
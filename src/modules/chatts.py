@@ -1,22 +1,215 @@
-import ChatTTS
-import torch
-import torchaudio
-import torch._dynamo
+"""Local, CPU-only narration with ChatTTS.
 
-torch._dynamo.config.suppress_errors = True
+The model is loaded, compiled and warmed once by a long-lived worker thread. Scripts from
+any number of threads are queued and synthesized together in one infer call, so the load
+and compile cost is paid once per batch run instead of once per card. The engine plugs into
+the narration cache like an ElevenLabs client:
 
-chat = ChatTTS.Chat()
-chat.load(compile=True) # Set to True for better performance
+    engine = get_engine()
+    card_narration(engine, card_name, script, **engine.synthesis)
 
-texts = ["Stardust Dragon is a Level eight Synchro monster that acts as a safeguard against destruction. The moment an effect threatens to wipe out a card on the field, Stardust Dragon can Tribute itself to shut it down, negating the activation and destroying the source. But it doesn’t stay gone for long. if its effect goes through, it returns from the Graveyard at the end of the turn, ready to protect your field all over again. Reliable, reactive, and hard to keep down, Stardust Dragon is the definition of a defensive ace."]
+    python src/modules/chatts.py "Stardust Dragon is a Level eight Synchro monster..."
+"""
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
 
-wavs = chat.infer(texts)
+import numpy as np
 
-for i in range(len(wavs)):
-    """
-    In some versions of torchaudio, the first line works but in other versions, so does the second line.
+SAMPLE_RATE = 24000
+MODEL_ID = "chattts"
+OUTPUT_FORMAT = "mp3_24000_128"
+
+# sampling parameters of the speech codes, part of the narration cache key
+INFER_SETTINGS = {
+    "temperature": 0.3,
+    "top_P": 0.7,
+    "top_K": 20
+}
+
+WARMUP_TEXT = "Warming up."
+
+
+def encode_mp3(wav, sample_rate=SAMPLE_RATE, bitrate="128k"):
+    """Encodes a mono float32 waveform to mp3 bytes, the format the narration cache stores"""
+    command = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', '-',
+        '-b:a', bitrate,
+        '-f', 'mp3', '-'
+    ]
+    result = subprocess.run(command, input=wav.astype('<f4').tobytes(), capture_output=True)
+    if result.returncode != 0:
+        raise Exception(f"Error encoding narration: {result.stderr.decode(errors='replace')}")
+    return result.stdout
+
+
+class ChatTTSEngine:
+    """ChatTTS behind a batching worker thread.
+
+    speaker_seed picks the (reproducible) voice. Requests arriving within max_wait seconds of
+    each other are synthesized in one infer call of up to max_batch scripts. threads caps the
+    torch CPU threads, so the engine can share the machine with the render processes.
     """
-    try:
-        torchaudio.save(f"basic_output{i}.wav", torch.from_numpy(wavs[i]).unsqueeze(0), 24000)
-    except:
-        torchaudio.save(f"basic_output{i}.wav", torch.from_numpy(wavs[i]), 24000)
\ No newline at end of file
+
+    def __init__(self, speaker_seed=2222, max_batch=8, max_wait=0.25, compile=True, threads=None,
+                 infer_settings=INFER_SETTINGS):
+        self.speaker_seed = speaker_seed
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.compile = compile
+        self.threads = threads
+        self.infer_settings = dict(infer_settings)
+
+        self.requests = queue.Queue()
+        self.ready = threading.Event()
+        self.load_error = None
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.batches = 0
+
+    @property
+    def synthesis(self):
+        """Keyword arguments for tts_cache.card_narration, so local narration is cached apart
+        from ElevenLabs narration of the same script"""
+        return {
+            "voice_id": f"chattts-{self.speaker_seed}",
+            "model_id": MODEL_ID,
+            "voice_settings": self.infer_settings,
+            "output_format": OUTPUT_FORMAT,
+        }
+
+    def start(self):
+        """Starts the worker and waits until the model is loaded and warm"""
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="chattts", daemon=True)
+                self.thread.start()
+        self.ready.wait()
+        if self.load_error:
+            raise self.load_error
+        return self
+
+    def load(self):
+        import ChatTTS
+        import torch
+        import torch._dynamo
+
+        torch._dynamo.config.suppress_errors = True
+        if self.threads:
+            torch.set_num_threads(self.threads)
+
+        start = time.perf_counter()
+        chat = ChatTTS.Chat()
+        chat.load(compile=self.compile, device=torch.device('cpu'))
+
+        # the speaker embedding is drawn from torch's RNG, seeding it keeps the same voice across runs
+        torch.manual_seed(self.speaker_seed)
+        speaker = chat.sample_random_speaker()
+        self.chat = chat
+        self.params_infer_code = ChatTTS.Chat.InferCodeParams(spk_emb=speaker, **self.infer_settings)
+
+        # the first infer pays for compilation, get it out of the way before real work arrives
+        self.infer([WARMUP_TEXT])
+        print(f"✅ ChatTTS loaded and warmed in {time.perf_counter() - start:.1f}s")
+
+    def infer(self, texts):
+        """Synthesizes texts in one call, returning one mono float32 waveform per text"""
+        wavs = self.chat.infer(texts, params_infer_code=self.params_infer_code)
+        # depending on the ChatTTS version each waveform is (samples,) or (1, samples)
+        return [np.asarray(wav, dtype=np.float32).reshape(-1) for wav in wavs]
+
+    def run(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.load_error = e
+        finally:
+            self.ready.set()
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)  # stop after this batch
+                    break
+                batch.append(request)
+
+            texts = [text for text, _ in batch]
+            try:
+                wavs = self.infer(texts)
+                self.batches += 1
+                for (_, future), wav in zip(batch, wavs):
+                    future.set_result(wav)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def submit(self, text):
+        """Queues text for the next batch, returns a Future of its waveform"""
+        self.start()
+        future = Future()
+        self.requests.put((text, future))
+        return future
+
+    def synthesize(self, texts):
+        """Waveforms for texts, synthesized as one batch"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def speech_stream(self, text, voice_id=None, model_id=None, voice_settings=None, output_format=None):
+        """What tts.synthesize_speech reads from a local engine: the mp3 as an iterable of chunks.
+        The synthesis arguments are fixed by the engine and only key the cache."""
+        return iter([encode_mp3(self.submit(text).result())])
+
+    def close(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(**settings):
+    """The process-wide engine, created (and loaded on first use) once"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ChatTTSEngine(**settings)
+        return _engine
+
+
+if __name__ == "__main__":
+    import sys
+    import wave
+
+    texts = sys.argv[1:] or ["Stardust Dragon is a Level eight Synchro monster that acts as a safeguard against destruction. The moment an effect threatens to wipe out a card on the field, Stardust Dragon can Tribute itself to shut it down, negating the activation and destroying the source. But it doesn’t stay gone for long. if its effect goes through, it returns from the Graveyard at the end of the turn, ready to protect your field all over again. Reliable, reactive, and hard to keep down, Stardust Dragon is the definition of a defensive ace."]
+
+    engine = get_engine().start()
+    start = time.perf_counter()
+    wavs = engine.synthesize(texts)
+    print(f"✅ Synthesized {len(wavs)} scripts in {time.perf_counter() - start:.1f}s")
+
+    for i, wav in enumerate(wavs):
+        with wave.open(f"basic_output{i}.wav", 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes((np.clip(wav, -1.0, 1.0) * 32767).astype('<i2').tobytes())
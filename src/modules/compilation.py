@@ -0,0 +1,217 @@
+import argparse
+import bisect
+import math
+import os
+import random
+
+import numpy as np
+
+from background_store import BackgroundStore
+from card_animation import CardFrameCache, card_scale_at
+from raw_render import LANDSCAPE_SIZE, CardCompositor, FrameTimings, RawVideoPipe, temp_path
+from audio_mix import mix_compilation_audio, music_path
+from encoders import select_encoder
+from tracing import span
+from yugioh_video_maker import YugiohVideoMaker, video_name
+
+
+def segment_frames(durations, fps):
+    """The first frame of every segment, and the total frame count at the end"""
+    starts = [0]
+    for duration in durations:
+        starts.append(starts[-1] + round(duration * fps))
+    return starts
+
+
+def chapter_list(titles, durations):
+    """(start, end, title) in seconds for every segment of the compilation"""
+    chapters = []
+    start = 0.0
+    for title, duration in zip(titles, durations):
+        chapters.append((start, start + duration, title))
+        start += duration
+    return chapters
+
+
+def write_ffmetadata(chapters, path, title=None):
+    def escape(text):
+        for char in "\\=;#\n":
+            text = text.replace(char, "\\" + char)
+        return text
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(";FFMETADATA1\n")
+        if title:
+            file.write(f"title={escape(title)}\n")
+        for start, end, chapter_title in chapters:
+            file.write("[CHAPTER]\nTIMEBASE=1/1000\n")
+            file.write(f"START={round(start * 1000)}\nEND={round(end * 1000)}\ntitle={escape(chapter_title)}\n")
+    return path
+
+
+def youtube_chapters(chapters):
+    """The chapter list for a YouTube description ("0:00 Card name" per line)"""
+    lines = []
+    for start, _, title in chapters:
+        minutes, seconds = divmod(int(start), 60)
+        hours, minutes = divmod(minutes, 60)
+        stamp = f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+        lines.append(f"{stamp} {title}")
+    return "\n".join(lines)
+
+
+def flip_out(scale_x, scale_y, angle, fraction, flip_axis='x'):
+    """The card turning away over the last part of its segment, fraction going from 0 to 1"""
+    turn = abs(math.cos(math.radians(90 * fraction)))
+    if flip_axis == 'x':
+        return scale_x, scale_y * turn, angle
+    if flip_axis == 'z':
+        return scale_x * turn, scale_y * turn, (angle or 0) + 90 * fraction
+    return scale_x * turn, scale_y, angle
+
+
+def render_compilation(card_imgs, audio_path, durations, video_path, fps=30, codec="libx264", ffmpeg_params=None,
+                       threads=4, chapters_path=None, transition=0.4, rotation_start=90, flip_axis='x', rotation_end=0,
+                       flip_duration_ratio=0.03, start_scale=0.4, end_scale=0.7):
+    """Renders several cards back to back in one encoder session: every card gets its own
+    flip-then-zoom segment of durations[i] seconds and turns away over the last `transition`
+    seconds, over one continuous background. The time per step of the frame loop is recorded
+    on the open span. Returns video_path."""
+    compositor = CardCompositor(BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps))
+    starts = segment_frames(durations, fps)
+
+    segment, cards = None, None
+    with RawVideoPipe(video_path, LANDSCAPE_SIZE, fps, codec=codec, ffmpeg_params=ffmpeg_params,
+                      audio_path=audio_path, threads=threads, chapters_path=chapters_path) as pipe:
+        timings = FrameTimings()
+        for i in range(starts[-1]):
+            index = bisect.bisect_right(starts, i) - 1
+            if index != segment:
+                # one card's resize cache at a time
+                segment = index
+                cards = CardFrameCache(np.ascontiguousarray(card_imgs[index][:, :, :3]))
+            duration = durations[index]
+
+            # the background runs on the compilation's timeline, the card on its segment's
+            t = i / fps
+            local_t = (i - starts[index]) / fps
+            scale_x, scale_y, angle = card_scale_at(local_t, duration, rotation_start, rotation_end, flip_axis,
+                                                    flip_duration_ratio, start_scale, end_scale)
+            if transition and local_t > duration - transition:
+                fraction = (local_t - (duration - transition)) / transition
+                scale_x, scale_y, angle = flip_out(scale_x, scale_y, angle, fraction, flip_axis)
+            card = cards.get_scaled(scale_x, scale_y, angle)
+            timings.lap("card_transform")
+            frame = compositor.compose(t, card)
+            timings.lap("composite")
+            pipe.write(frame)
+            timings.lap("encode")
+    timings.lap("encode")
+    timings.record()
+
+    return video_path
+
+
+def card_maker(card, match_policy="reject"):
+    """A YugiohVideoMaker for a card name or a cardinfo.php card dict, never prompting"""
+    if isinstance(card, str):
+        return YugiohVideoMaker(card, reuse_audio="reuse", match_policy=match_policy)
+    return YugiohVideoMaker(
+        card_name=card["name"],
+        card_effect=card["desc"],
+        card_readable_type=card["humanReadableCardType"],
+        card_img=card["card_images"][0]["image_url"],
+        card_type=card["type"],
+        card_atk=card.get("atk"),
+        card_def=card.get("def"),
+        card_id=card.get("id"),
+        reuse_audio="reuse",
+        match_policy=match_policy
+    )
+
+
+def create_compilation(cards, title="Compilation", video_path=None, bg_audio=None, tts_backend="elevenlabs",
+                       encoder_profile="balanced", duck_gain=None, match_policy="reject", fps=30, pad=1.0,
+                       transition=0.4, **animation):
+    """Renders a "top 10"-style video of cards (names or cardinfo.php dicts, in order) as one
+    continuous output with one music bed and one encoder session, chaptered per card.
+
+    Every card is scripted and narrated as for its own video (through the same caches), then
+    the narrations are laid out back to back with pad seconds after each. The chapters are
+    written into the file and, for the upload description, next to it as .chapters.txt.
+    Returns (video_path, chapters).
+    """
+    makers = []
+    narrations = []
+    for card in cards:
+        with span("fetch", card if isinstance(card, str) else card.get("name")):
+            maker = card_maker(card, match_policy)
+        if maker.audio:
+            narration = maker.audio
+        else:
+            with span("script", maker.card_name):
+                maker.set_script(maker.get_card_script())
+            with span("tts", maker.card_name):
+                narration = maker.get_audio(tts_backend)
+        makers.append(maker)
+        narrations.append(narration)
+
+    choice = bg_audio or random.randint(1, 5)
+    video_path = video_path or f"./src/videos/{video_name(title)}.mp4"
+    mix_path = temp_path(".wav")
+    chapters_path = temp_path(".txt")
+    try:
+        with span("audio_mix", title, cards=len(makers)):
+            durations = mix_compilation_audio(narrations, music_path(choice), mix_path, duck_gain=duck_gain, pad=pad,
+                                              fps=fps)
+
+        chapters = chapter_list([maker.card_name for maker in makers], durations)
+        write_ffmetadata(chapters, chapters_path, title=title)
+
+        codec, ffmpeg_params = select_encoder(encoder_profile)
+        with span("render", title, codec=codec, cards=len(makers)) as render_span:
+            render_compilation([maker.card_img for maker in makers], mix_path, durations, video_path, fps=fps,
+                               codec=codec, ffmpeg_params=ffmpeg_params, chapters_path=chapters_path,
+                               transition=transition, **animation)
+            render_span.set(bytes_written=os.path.getsize(video_path))
+    finally:
+        os.remove(mix_path)
+        os.remove(chapters_path)
+
+    with open(os.path.splitext(video_path)[0] + ".chapters.txt", 'w', encoding='utf-8') as file:
+        file.write(youtube_chapters(chapters) + "\n")
+
+    print(f"✅ Compilation of {len(makers)} cards created: {video_path}")
+    print(youtube_chapters(chapters))
+    return video_path, chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render several cards back to back into one chaptered video")
+    parser.add_argument("cards", nargs="*", help="card names, in order")
+    parser.add_argument("--url", help="take the cards from a Yu-Gi-Oh database search instead")
+    parser.add_argument("--max-cards", type=int, default=10)
+    parser.add_argument("--title", default="Compilation")
+    parser.add_argument("--output", help="video path (default: src/videos/<title>.mp4)")
+    parser.add_argument("--music", type=int, choices=range(1, 6), help="music bed (default: random)")
+    parser.add_argument("--match", choices=("accept", "reject"), default="reject",
+                        help="closest card when a name has no exact match")
+    parser.add_argument("--tts-backend", choices=("elevenlabs", "chattts"), default="elevenlabs")
+    parser.add_argument("--profile", default="balanced", help="encoder profile (see encoders.PROFILES)")
+    args = parser.parse_args()
+
+    cards = list(args.cards)
+    if args.url:
+        from card_source import iter_cards
+        from mass_video_maker import strip_ygoprodeck_url
+
+        cards += list(iter_cards(strip_ygoprodeck_url(args.url), max_cards=args.max_cards))
+    if not cards:
+        parser.error("give card names or --url")
+
+    create_compilation(cards, title=args.title, video_path=args.output, bg_audio=args.music,
+                       tts_backend=args.tts_backend, encoder_profile=args.profile, match_policy=args.match)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from background_store import BackgroundStore
+from card_animation import CardFrameCache, card_scale_at
+from raw_render import LANDSCAPE_SIZE, CardCompositor, FrameTimings, RawVideoPipe, encode_audio, temp_path
+
+SHORT_SIZE = (1080, 1920)
+
+
+def render_dual(card_img, audio_path, duration, video_path, short_path, fps=30, codec="libx264", ffmpeg_params=None,
+                threads=4, short_card_width=0.8, rotation_start=90, flip_axis='x', rotation_end=0,
+                flip_duration_ratio=0.03, start_scale=0.4, end_scale=0.7):
+    """Renders the 16:9 video and the native 9:16 Short in a single pass over the timeline.
+
+    Every frame is composited once per layout from the shared background store and card
+    cache and streamed to both encoders, so the Short never has to be decoded and re-encoded
+    from the landscape file. The mixed audio is encoded once and copied into both outputs.
+
+    short_card_width is the width of the fully zoomed card as a fraction of the Short's width.
+    The time per step of the frame loop, both layouts together, is recorded on the open span.
+    """
+    card_img = np.ascontiguousarray(card_img[:, :, :3])
+
+    landscape = CardCompositor(BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps))
+    short = CardCompositor(BackgroundStore.open(size=SHORT_SIZE, fps=fps))
+
+    # the Short shows the same animation, scaled so the card ends at short_card_width of the frame
+    short_factor = (SHORT_SIZE[0] * short_card_width) / (card_img.shape[1] * end_scale)
+
+    landscape_cards = CardFrameCache(card_img)
+    short_cards = CardFrameCache(card_img)
+
+    # encode the audio once, both encoders just copy it in
+    encoded_audio = temp_path(".m4a")
+
+    try:
+        encode_audio(audio_path, encoded_audio)
+
+        with RawVideoPipe(video_path, LANDSCAPE_SIZE, fps, codec=codec, ffmpeg_params=ffmpeg_params,
+                          audio_path=encoded_audio, audio_codec="copy", threads=threads) as video_pipe, \
+             RawVideoPipe(short_path, SHORT_SIZE, fps, codec=codec, ffmpeg_params=ffmpeg_params,
+                          audio_path=encoded_audio, audio_codec="copy", threads=threads) as short_pipe:
+            timings = FrameTimings()
+            for i in range(int(duration * fps)):
+                t = i / fps
+                scale_x, scale_y, angle = card_scale_at(t, duration, rotation_start, rotation_end, flip_axis,
+                                                        flip_duration_ratio, start_scale, end_scale)
+
+                landscape_card = landscape_cards.get_scaled(scale_x, scale_y, angle)
+                short_card = short_cards.get_scaled(scale_x * short_factor, scale_y * short_factor, angle)
+                timings.lap("card_transform")
+                landscape_frame = landscape.compose(t, landscape_card)
+                short_frame = short.compose(t, short_card)
+                timings.lap("composite")
+                video_pipe.write(landscape_frame)
+                short_pipe.write(short_frame)
+                timings.lap("encode")
+        timings.lap("encode")
+        timings.record()
+    finally:
+        if os.path.exists(encoded_audio):
+            os.remove(encoded_audio)
+
+    return video_path, short_path
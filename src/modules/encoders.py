@@ -0,0 +1,195 @@
+import json
+import os
+import socket
+import subprocess
+import time
+
+FFMPEG = 'ffmpeg'
+# what works depends on the machine (GPU, drivers), not just the ffmpeg build, and render
+# nodes may share one working directory, so every host probes into its own file
+HOST = socket.gethostname()
+CACHE_PATH = os.path.join('src', 'cache', f'encoders.{HOST}.json')
+
+# H.264 encoders in order of preference when nothing has been measured yet: hardware first
+H264_ENCODERS = ["h264_nvenc", "h264_qsv", "h264_amf", "h264_videotoolbox", "libx264", "libopenh264"]
+SOFTWARE_ENCODERS = {"libx264", "libopenh264"}
+# concurrent sessions a hardware encoder is safe to open from one render: consumer NVIDIA
+# drivers have long refused more than 3 NVENC sessions per system
+HARDWARE_SESSIONS = 3
+
+# Named speed/quality profiles per encoder. Our videos are a mostly static card over a looping
+# background, so a long GOP and constant quality rate control give small files at little cost.
+PROFILES = {
+    "fast": {
+        "h264_nvenc": ["-preset", "p1", "-rc", "vbr", "-cq", "26", "-g", "300"],
+        "h264_qsv": ["-preset", "veryfast", "-global_quality", "26", "-g", "300"],
+        "h264_amf": ["-quality", "speed", "-rc", "cqp", "-qp_i", "24", "-qp_p", "26", "-g", "300"],
+        "h264_videotoolbox": ["-b:v", "6M", "-g", "300"],
+        "libx264": ["-preset", "veryfast", "-crf", "23", "-g", "300"],
+        "libopenh264": ["-b:v", "6M", "-g", "300"],
+    },
+    "balanced": {
+        "h264_nvenc": ["-preset", "p4", "-rc", "vbr", "-cq", "23", "-g", "300"],
+        "h264_qsv": ["-preset", "medium", "-global_quality", "23", "-g", "300"],
+        "h264_amf": ["-quality", "balanced", "-rc", "cqp", "-qp_i", "21", "-qp_p", "23", "-g", "300"],
+        "h264_videotoolbox": ["-b:v", "8M", "-g", "300"],
+        "libx264": ["-preset", "faster", "-crf", "21", "-g", "300"],
+        "libopenh264": ["-b:v", "8M", "-g", "300"],
+    },
+    "quality": {
+        "h264_nvenc": ["-preset", "p6", "-rc", "vbr", "-cq", "19", "-g", "300"],
+        "h264_qsv": ["-preset", "slower", "-global_quality", "19", "-g", "300"],
+        "h264_amf": ["-quality", "quality", "-rc", "cqp", "-qp_i", "18", "-qp_p", "20", "-g", "300"],
+        "h264_videotoolbox": ["-b:v", "12M", "-g", "300"],
+        "libx264": ["-preset", "medium", "-crf", "18", "-g", "300"],
+        "libopenh264": ["-b:v", "12M", "-g", "300"],
+    },
+}
+
+# probe results for this process, so workers only read the cache file once
+_probe = None
+
+
+def ffmpeg_version(ffmpeg=FFMPEG):
+    result = subprocess.run([ffmpeg, '-hide_banner', '-version'], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Error, could not run {ffmpeg}: {result.stderr}")
+    return result.stdout.splitlines()[0].strip()
+
+
+def listed_encoders(ffmpeg=FFMPEG):
+    """Names of all encoders compiled into ffmpeg"""
+    result = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, text=True)
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # encoder lines look like " V....D libx264   libx264 H.264 / AVC ..."
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS":
+            names.add(parts[1])
+    return names
+
+
+def encoder_works(encoder, ffmpeg=FFMPEG):
+    """Listed is not the same as usable (no GPU, missing driver), so try a tiny encode."""
+    command = [
+        ffmpeg, '-hide_banner', '-v', 'error',
+        '-f', 'lavfi', '-i', 'color=c=black:size=320x240:rate=30:duration=0.2',
+        '-c:v', encoder,
+        '-pix_fmt', 'yuv420p',
+        '-f', 'null', '-'
+    ]
+    try:
+        return subprocess.run(command, capture_output=True, text=True, timeout=30).returncode == 0
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def load_cache(cache_path=CACHE_PATH):
+    if os.path.isfile(cache_path):
+        with open(cache_path, 'r') as file:
+            return json.load(file)
+    return None
+
+
+def save_cache(data, cache_path=CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def probe(ffmpeg=FFMPEG, cache_path=CACHE_PATH, refresh=False):
+    """Returns {"ffmpeg": version, "host": name, "available": [...], "throughput": {...}}, probing
+    ffmpeg only when the cache is missing or was written for a different ffmpeg build or host."""
+    global _probe
+    if _probe is not None and not refresh:
+        return _probe
+
+    version = ffmpeg_version(ffmpeg)
+    data = None if refresh else load_cache(cache_path)
+
+    if data is None or data.get("ffmpeg") != version or data.get("host") != HOST:
+        print("🔃 Probing ffmpeg encoders")
+        listed = listed_encoders(ffmpeg)
+        available = [name for name in H264_ENCODERS if name in listed and encoder_works(name, ffmpeg)]
+        data = {"ffmpeg": version, "host": HOST, "available": available, "throughput": {}}
+        save_cache(data, cache_path)
+        print(f"✅ Usable H.264 encoders: {', '.join(available) if available else 'none'}")
+
+    _probe = data
+    return data
+
+
+def session_limit(codec):
+    """How many encodes with codec can run at once, None for a software encoder (no limit)"""
+    return None if codec in SOFTWARE_ENCODERS else HARDWARE_SESSIONS
+
+
+def select_encoder(profile="balanced", ffmpeg=FFMPEG):
+    """Returns (codec, ffmpeg_params) for the fastest working encoder for a profile.
+
+    Measured throughput from benchmark() wins; otherwise hardware encoders are preferred
+    over libx264, and libopenh264 is the last resort. An encoder that has not been measured
+    for the profile (e.g. one that became usable after the benchmark) keeps its place in that
+    order, so it is still picked over measured encoders it is preferred to.
+    """
+    if profile not in PROFILES:
+        raise Exception(f"Error, unknown encoder profile {profile}. Choose from {', '.join(PROFILES)}")
+
+    data = probe(ffmpeg)
+    available = data["available"]
+    if not available:
+        raise Exception("Error, ffmpeg has no working H.264 encoder")
+
+    measured = data["throughput"].get(profile, {})
+    fastest = max((name for name in available if name in measured), key=measured.get, default=None)
+    codec = next(name for name in available if name not in measured or name == fastest)
+
+    return codec, list(PROFILES[profile][codec])
+
+
+def benchmark(profiles=None, frames=150, size=(1920, 1080), ffmpeg=FFMPEG, cache_path=CACHE_PATH):
+    """Encodes a synthetic clip with every usable encoder and records frames/sec per profile,
+    so select_encoder picks by measurement instead of by preference order."""
+    global _probe
+    data = probe(ffmpeg, cache_path)
+    profiles = profiles or list(PROFILES)
+    width, height = size
+
+    for profile in profiles:
+        results = data["throughput"].setdefault(profile, {})
+        for codec in data["available"]:
+            command = [
+                ffmpeg, '-hide_banner', '-v', 'error',
+                # moving test pattern under a static overlay, roughly what a render looks like
+                '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate=30',
+                '-frames:v', str(frames),
+                '-c:v', codec,
+                '-pix_fmt', 'yuv420p',
+                *PROFILES[profile][codec],
+                '-f', 'null', '-'
+            ]
+            start = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+
+            if result.returncode != 0:
+                # measured as unusable, so the preference order never falls back to it
+                results[codec] = 0.0
+                print(f"❌ {codec} ({profile}) failed: {result.stderr.strip()}")
+                continue
+
+            results[codec] = round(frames / elapsed, 1)
+            print(f"✅ {codec} ({profile}): {results[codec]} fps")
+
+    save_cache(data, cache_path)
+    _probe = data
+    return data["throughput"]
+
+
+if __name__ == "__main__":
+    benchmark()
+    for profile in PROFILES:
+        codec, params = select_encoder(profile)
+        print(f"{profile}: {codec} {' '.join(params)}")
@@ -0,0 +1,101 @@
+import hashlib
+import os
+from io import BytesIO
+
+import numpy as np
+
+from api_clients import http
+
+CACHE_DIR = os.path.join('src', 'cache', 'images')
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # 2 GB of card art and decoded arrays
+
+
+def cache_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def cache_paths(url, cache_dir=CACHE_DIR):
+    base = os.path.join(cache_dir, cache_key(url))
+    return base + ".jpg", base + ".npy"
+
+
+def get_card_image(url, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Returns the card art at url as an RGB array.
+
+    The first call downloads and decodes the image and stores both the original file and
+    the decoded array. Later calls, in any process, memory-map the array read-only and skip
+    both the download and the JPEG decode.
+    """
+    image_path, array_path = cache_paths(url, cache_dir)
+
+    if os.path.isfile(array_path):
+        try:
+            card_img = np.load(array_path, mmap_mode='r')
+            os.utime(array_path)  # mark as recently used for eviction
+            return card_img
+        except (ValueError, OSError):
+            # truncated or corrupt entry, fetch it again
+            os.remove(array_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if os.path.isfile(image_path):
+        with open(image_path, 'rb') as f:
+            content = f.read()
+    else:
+        response = http().get(url)
+        response.raise_for_status()
+        content = response.content
+        write_atomic(image_path, content)
+
+    from PIL import Image
+
+    card_img = np.array(Image.open(BytesIO(content)).convert('RGB'))
+
+    tmp_path = f"{array_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, card_img)
+    os.replace(tmp_path, array_path)
+
+    evict(cache_dir, max_bytes)
+    return np.load(array_path, mmap_mode='r')
+
+
+def write_atomic(path, content):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Deletes least recently used entries until the cache fits in max_bytes"""
+    entries = {}
+    total = 0
+    for name in os.listdir(cache_dir):
+        if ".tmp" in name:
+            continue
+        path = os.path.join(cache_dir, name)
+        stat = os.stat(path)
+        key = os.path.splitext(name)[0]
+        size, used = entries.get(key, (0, 0))
+        entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+        total += stat.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for key, (size, used) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        for ext in (".jpg", ".npy"):
+            path = os.path.join(cache_dir, key + ext)
+            try:
+                os.remove(path)
+            except OSError:
+                # missing, or still memory-mapped by a worker on Windows
+                pass
+        total -= size
+        removed += 1
+    return removed
+
@@ -0,0 +1,428 @@
+"""A durable render queue that any number of workers, on any number of machines, pull from.
+
+Jobs live in one SQLite file: a render job per card and, unless the Short is rendered in
+the same pass, a Short conversion job that the render enqueues when it completes. A worker
+leases a job for lease_seconds and keeps the lease alive with heartbeats while it runs; a
+worker that dies stops heartbeating, and its job is handed to the next worker once the lease
+runs out. Failed jobs are retried up to max_attempts times. Completion is idempotent: the
+first one is recorded and any later one (from a worker whose lease had expired) is ignored.
+
+    python job_queue.py enqueue "<database search URL>" --with-short
+    python job_queue.py work --processes 3 --drain
+    python job_queue.py status
+
+Every node runs `work` against the same queue file and working directory. Local workers
+use SQLite's WAL mode. On a network file system, WAL does not work, so pass --no-wal there
+(rollback journal with file locks). The file system's locking must then be reliable for
+SQLite.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+QUEUE_PATH = os.path.join('src', 'cache', 'jobs.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    lease_until REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, kind, not_before);
+"""
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Jobs with leases in a SQLite file. Safe to use from several threads and processes:
+    every thread gets its own connection, and every state change is one write transaction."""
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=300, retry_delay=30, wal=True):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.wal = wal
+        self.local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # autocommit, transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            if self.wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def write(self, statements):
+        """Runs [(sql, params)] in one write transaction, returning the cursors"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursors = [conn.execute(sql, params) for sql, params in statements]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursors
+
+    def add(self, kind, key, payload, max_attempts=3):
+        """Enqueues a job, unless one of this kind and key already exists. True if it was added."""
+        return self.add_many([(kind, key, payload)], max_attempts) == 1
+
+    def add_many(self, jobs, max_attempts=3):
+        now = time.time()
+        cursors = self.write([(
+            "INSERT OR IGNORE INTO jobs (kind, key, payload, max_attempts, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload, ensure_ascii=False), max_attempts, now, now)
+        ) for kind, key, payload in jobs])
+        return sum(cursor.rowcount for cursor in cursors)
+
+    def lease(self, worker, kinds=("render", "short")):
+        """Leases the oldest job of one of kinds that is ready (pending, or leased by a worker
+        that stopped heartbeating), or returns None. The returned job's payload is decoded."""
+        now = time.time()
+        marks = ",".join("?" * len(kinds))
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # expired leases that used up their attempts won't be handed out again
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', error = COALESCE(error, 'lease expired'), updated = ? "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= max_attempts", (now, now))
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE kind IN ({marks}) AND not_before <= ? "
+                "AND (state = 'pending' OR (state = 'leased' AND lease_until < ?)) ORDER BY id LIMIT 1",
+                (*kinds, now, now)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def heartbeat(self, job_id, worker):
+        """Extends the lease. False if the worker no longer holds it."""
+        now = time.time()
+        cursor, = self.write([(
+            "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, job_id, worker)
+        )])
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result=None, then=()):
+        """Records the job as done with its result and enqueues the follow-up jobs in `then`
+        ((kind, key, payload) each) in the same transaction. Only the first completion counts:
+        False if the job was already done."""
+        now = time.time()
+        cursors = self.write([(
+            "UPDATE jobs SET state = 'done', worker = ?, result = ?, error = NULL, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND state != 'done'",
+            (worker, json.dumps(result, ensure_ascii=False), now, job_id)
+        )] + [(
+            "INSERT OR IGNORE INTO jobs (kind, key, payload, created, updated) VALUES (?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload, ensure_ascii=False), now, now)
+        ) for kind, key, payload in then])
+        if cursors[0].rowcount == 0:
+            # a late duplicate, its follow-ups were enqueued by the first completion already
+            return False
+        return True
+
+    def fail(self, job_id, worker, error):
+        """Gives the job back for a retry after retry_delay * attempts seconds, or marks it
+        failed once it has used up its attempts. Ignored if the worker lost the lease.
+        error is stored as text (a traceback keeps its end, where the exception is)."""
+        now = time.time()
+        self.write([(
+            "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_until = NULL, not_before = ? + ? * attempts, updated = ? "
+            "WHERE id = ? AND worker = ? AND state = 'leased'",
+            (str(error)[-4000:], now, self.retry_delay, now, job_id, worker)
+        )])
+
+    def release(self, worker):
+        """Hands the worker's leased jobs back without using up an attempt (clean shutdown)"""
+        self.write([(
+            "UPDATE jobs SET state = 'pending', attempts = attempts - 1, lease_until = NULL, updated = ? "
+            "WHERE worker = ? AND state = 'leased'", (time.time(), worker)
+        )])
+
+    def retry_failed(self, kind=None):
+        """Gives every failed job (of kind) a fresh set of attempts"""
+        cursor, = self.write([(
+            "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0, updated = ? "
+            "WHERE state = 'failed' AND (? IS NULL OR kind = ?)", (time.time(), kind, kind)
+        )])
+        return cursor.rowcount
+
+    def counts(self):
+        """{kind: {state: jobs}}"""
+        counts = {}
+        for row in self.conn.execute("SELECT kind, state, COUNT(*) AS jobs FROM jobs GROUP BY kind, state"):
+            counts.setdefault(row["kind"], dict.fromkeys(STATES, 0))[row["state"]] = row["jobs"]
+        return counts
+
+    def unfinished(self, kinds=("render", "short")):
+        marks = ",".join("?" * len(kinds))
+        return self.conn.execute(f"SELECT COUNT(*) FROM jobs WHERE kind IN ({marks}) AND state IN ('pending', 'leased')",
+                                 kinds).fetchone()[0]
+
+    def results(self, kind):
+        """(key, result) of every done job of kind"""
+        return [(row["key"], json.loads(row["result"])) for row in
+                self.conn.execute("SELECT key, result FROM jobs WHERE kind = ? AND state = 'done' ORDER BY id", (kind,))]
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class Heartbeat:
+    """Keeps a job's lease alive from a background thread while the job runs"""
+
+    def __init__(self, queue, job, worker):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        try:
+            while not self.stopped.wait(interval):
+                if not self.queue.heartbeat(self.job["id"], self.worker):
+                    # another worker took it over, this one's result will be ignored if it is second
+                    self.lost = True
+                    print(f"⚠️ Lost the lease on {self.job['kind']} job {self.job['key']}")
+                    return
+        finally:
+            self.queue.close()  # this thread's connection
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+        return False
+
+
+def render_job(payload):
+    """Scripts, narrates and renders one card. Returns (result, follow-up jobs)."""
+    from manifest import card_key
+    from mass_video_maker import process_card
+
+    card, with_short, short_dir = payload["card"], payload["with_short"], payload["short_dir"]
+    # the render's own exception fails the job, so its traceback is what gets stored
+    _, video_path, short_path, _ = process_card(card, with_short=with_short, short_dir=short_dir, raise_errors=True)
+
+    then = []
+    if not with_short:
+        from yugioh_video_maker import video_name
+
+        short_path = os.path.join(short_dir, f"{video_name(card['name'])}_short.mp4")
+        then.append(("short", card_key(card), {"video_path": video_path, "short_path": short_path}))
+    return {"video_path": video_path, "short_path": short_path if with_short else None}, then
+
+
+def short_job(payload):
+    from mass_shorts_maker import convert_to_short
+
+    os.makedirs(os.path.dirname(payload["short_path"]) or '.', exist_ok=True)
+    convert_to_short(payload["video_path"], payload["short_path"], threads=payload.get("threads"), raise_errors=True)
+    return {"short_path": payload["short_path"]}, []
+
+
+HANDLERS = {"render": render_job, "short": short_job}
+
+
+def run_worker(queue_path=QUEUE_PATH, kinds=("render", "short"), drain=False, poll=5.0, lease_seconds=300,
+               retry_delay=30, wal=True, handlers=None, worker=None):
+    """Pulls and runs jobs until interrupted, or with drain until no job of kinds is pending or
+    leased any more. Returns the number of jobs this worker completed."""
+    handlers = handlers or HANDLERS
+    worker = worker or worker_name()
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds, retry_delay=retry_delay, wal=wal)
+
+    if handlers is HANDLERS and "render" in kinds:
+        from worker_pool import warm_render_worker
+
+        warm_render_worker()
+
+    completed = 0
+    print(f"👷 Worker {worker} pulling {', '.join(kinds)} jobs from {queue_path}")
+    try:
+        while True:
+            job = queue.lease(worker, kinds)
+            if job is None:
+                if drain and queue.unfinished(kinds) == 0:
+                    break
+                time.sleep(poll)
+                continue
+
+            print(f"🔃 {job['kind']} {job['key']} (attempt {job['attempts']}/{job['max_attempts']})")
+            try:
+                with Heartbeat(queue, job, worker):
+                    result, then = handlers[job["kind"]](job["payload"])
+            except Exception as e:
+                print(f"❌ {job['kind']} {job['key']} failed: {e}")
+                queue.fail(job["id"], worker, traceback.format_exc())
+                continue
+
+            if queue.complete(job["id"], worker, result, then):
+                completed += 1
+            else:
+                print(f"⏭️ {job['kind']} {job['key']} was already completed by another worker")
+    finally:
+        queue.release(worker)
+        queue.close()
+
+    print(f"✅ Worker {worker} completed {completed} jobs")
+    return completed
+
+
+def warm_node(queue_path=QUEUE_PATH, kinds=("render", "short"), wal=True):
+    """Probes the encoders and builds the background frame stores once, before this machine's
+    worker processes start and map them. The Short store is built too if a queued render job
+    renders its Short in the same pass."""
+    import encoders
+
+    encoders.probe()
+    if "render" not in kinds:
+        return
+
+    from background_store import BackgroundStore
+    from dual_render import SHORT_SIZE
+    from raw_render import LANDSCAPE_SIZE
+
+    BackgroundStore.open(size=LANDSCAPE_SIZE)
+    queue = JobQueue(queue_path, wal=wal)
+    try:
+        with_short = queue.conn.execute(
+            "SELECT 1 FROM jobs WHERE kind = 'render' AND state IN ('pending', 'leased') "
+            "AND json_extract(payload, '$.with_short') LIMIT 1"
+        ).fetchone() is not None
+    finally:
+        queue.close()
+    if with_short:
+        BackgroundStore.open(size=SHORT_SIZE)
+
+
+def enqueue_search(web_db_url, queue_path=QUEUE_PATH, with_short=False, short_dir=os.path.join('src', 'shorts'),
+                   max_cards=None, max_attempts=3, wal=True):
+    """Adds a render job for every card of a database search. Cards already queued are left as they are."""
+    from card_source import iter_cards
+    from manifest import card_key
+    from mass_video_maker import strip_ygoprodeck_url
+
+    queue = JobQueue(queue_path, wal=wal)
+    jobs = [("render", card_key(card), {"card": card, "with_short": with_short, "short_dir": short_dir})
+            for card in iter_cards(strip_ygoprodeck_url(web_db_url), max_cards=max_cards)]
+    added = queue.add_many(jobs, max_attempts)
+    print(f"✅ Queued {added} new render jobs ({len(jobs) - added} were already queued)")
+    queue.close()
+    return added
+
+
+def print_status(queue_path=QUEUE_PATH, wal=True):
+    queue = JobQueue(queue_path, wal=wal)
+    for kind, states in sorted(queue.counts().items()):
+        print(f"{kind:>8}: " + ", ".join(f"{states[state]} {state}" for state in STATES))
+    for row in queue.conn.execute("SELECT kind, key, attempts, error FROM jobs WHERE state = 'failed' ORDER BY id"):
+        print(f"❌ {row['kind']} {row['key']} after {row['attempts']} attempts: {((row['error'] or '').strip().splitlines() or [''])[-1][:200]}")
+    queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable render queue shared by any number of workers")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="the SQLite queue file every worker shares")
+    parser.add_argument("--no-wal", dest="wal", action="store_false", help="for a queue on a network file system")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="queue a render job for every card of a database search")
+    enqueue.add_argument("url")
+    enqueue.add_argument("--with-short", action="store_true", help="render each Short in the same pass")
+    enqueue.add_argument("--short-dir", default=os.path.join('src', 'shorts'))
+    enqueue.add_argument("--max-cards", type=int)
+    enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    work = commands.add_parser("work", help="pull and run jobs")
+    work.add_argument("--kinds", default="render,short", help="comma separated: render, short")
+    work.add_argument("--processes", type=int, default=1, help="worker processes on this machine")
+    work.add_argument("--drain", action="store_true", help="exit once nothing is pending or leased")
+    work.add_argument("--lease", type=float, default=300, help="lease length in seconds")
+    work.add_argument("--retry-delay", type=float, default=30, help="seconds before a failed job's retry, per attempt")
+    work.add_argument("--poll", type=float, default=5.0)
+
+    commands.add_parser("status", help="job counts per kind and state, and the failures")
+    retry = commands.add_parser("retry", help="give failed jobs a fresh set of attempts")
+    retry.add_argument("--kind")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        enqueue_search(args.url, args.queue, args.with_short, args.short_dir, args.max_cards, args.max_attempts, args.wal)
+    elif args.command == "work":
+        kinds = tuple(kind.strip() for kind in args.kinds.split(",") if kind.strip())
+        settings = dict(queue_path=args.queue, kinds=kinds, drain=args.drain, poll=args.poll,
+                        lease_seconds=args.lease, retry_delay=args.retry_delay, wal=args.wal)
+        # decoded and probed once here rather than by every process at the same time
+        warm_node(args.queue, kinds, args.wal)
+        if args.processes == 1:
+            run_worker(**settings)
+        else:
+            workers = [multiprocessing.Process(target=run_worker, kwargs=settings) for _ in range(args.processes)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join()
+    elif args.command == "status":
+        print_status(args.queue, args.wal)
+    elif args.command == "retry":
+        print(f"✅ {JobQueue(args.queue, wal=args.wal).retry_failed(args.kind)} failed jobs queued again")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+RUNS_DIR = os.path.join('src', 'cache', 'runs')
+
+
+def file_fingerprint(path, sample=1 << 20):
+    """Size plus a hash of the first and last MB: cheap enough for videos, and catches
+    truncated or replaced outputs"""
+    size = os.path.getsize(path)
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        h.update(f.read(sample))
+        if size > sample:
+            f.seek(max(sample, size - sample))
+            h.update(f.read(sample))
+    return f"{size}:{h.hexdigest()[:16]}"
+
+
+def manifest_path_for(query, runs_dir=RUNS_DIR):
+    """The same database search always resumes the same manifest"""
+    return os.path.join(runs_dir, f"{hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]}.json")
+
+
+def card_key(card):
+    return str(card.get("id") or card["name"])
+
+
+class RunManifest:
+    """Per-card record of completed stages and their outputs for one batch run.
+
+    Only the parent process writes it (worker results come back to the parent), and every
+    write replaces the file atomically, so a crash leaves the last completed stage intact.
+    A stage counts as done only while its output files still match their fingerprints.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "cards": {}}
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.data = json.load(file)
+
+    def entry(self, card):
+        return self.data["cards"].get(card_key(card), {}).get("stages", {})
+
+    def stage(self, card, stage):
+        """The recorded stage if it is done and its outputs are still valid, else None"""
+        record = self.entry(card).get(stage)
+        if record is None:
+            return None
+        for path, fingerprint in record.get("files", {}).items():
+            if not os.path.isfile(path) or file_fingerprint(path) != fingerprint:
+                return None
+        return record
+
+    def is_done(self, card, stage):
+        return self.stage(card, stage) is not None
+
+    def mark(self, card, stage, files=(), **values):
+        """Records stage as done for card, fingerprinting the output files"""
+        record = {
+            "done_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": {path: file_fingerprint(path) for path in files if path},
+            **values,
+        }
+        with self.lock:
+            card_entry = self.data["cards"].setdefault(card_key(card), {"name": card["name"], "stages": {}})
+            card_entry["stages"][stage] = record
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.data, file, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def completed(self, stage):
+        """(card, record) for every card whose stage is done and still valid. card only has
+        the id and name, enough to mark() further stages."""
+        completed = []
+        for key, card_entry in list(self.data["cards"].items()):
+            card = {"id": key, "name": card_entry["name"]}
+            record = self.stage(card, stage)
+            if record is not None:
+                completed.append((card, record))
+        return completed
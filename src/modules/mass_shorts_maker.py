@@ -1,55 +1,93 @@
 import os
 import subprocess
-import cv2
 import time
-import mass_video_maker
+from encoders import select_encoder
+from media_probe import probe_media
+from scheduler import Scheduler, run_admitted
+from worker_pool import warm_pool, warm_short_worker
+import tracing
+from tracing import span
+from manifest import RunManifest, manifest_path_for
+from prompting import InteractionRequired, ask, confirm
+import argparse
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def convert_to_short(input_path, output_path):
-    """Converts the video to a vertical short (1080x1920) using FFmpeg with GPU acceleration (NVENC)."""
+SHORTS_DIR = "G:\\My Drive\\Prestiged\\Shorts"
+POSTED_SHORTS_DIR = "G:\\My Drive\\Prestiged\\Posted Shorts"
+
+def convert_to_short(input_path, output_path, encoder_profile="fast", size=None, threads=None, raise_errors=False):
+    """Converts the video to a vertical short (1080x1920) using FFmpeg with the fastest available encoder.
+
+    size is the (width, height) of the input if the caller already knows it (e.g. from the run
+    manifest), otherwise it is read from the container header. The audio is copied as-is.
+    threads caps the threads this ffmpeg uses, so parallel conversions share a fixed budget.
+    A failure is printed and returns False, or with raise_errors is raised as it is.
+    """
     try:
-        # Get video resolution using OpenCV
-        cap = cv2.VideoCapture(input_path)
-        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        cap.release()
+        duration = None
+        if size:
+            width, height = size
+        else:
+            # header only, no decoder is opened
+            info = probe_media(input_path)
+            width, height, duration = info["width"], info["height"], info["duration"]
 
         # Check if the video is in 16:9 aspect ratio
-        if width / height != 16 / 9:
+        if width * 9 != height * 16:
             print(f"Warning: The video is not in 16:9 aspect ratio. It is {width}:{height}.")
 
-        # Calculate the crop dimensions for a 9:16 aspect ratio (vertical)
-        crop_w = int(height * 9 / 16)  # Set the crop width to maintain 9:16 aspect ratio
-        crop_x = int((width - crop_w) / 2)  # Center crop horizontally
+        # Calculate the crop dimensions for a 9:16 aspect ratio (vertical), even for yuv420p
+        crop_w = (height * 9 // 16) // 2 * 2
+        crop_x = (width - crop_w) // 2  # Center crop horizontally
         
+        # Pick the encoder once per process (NVENC on GPU machines, libx264 on CPU-only nodes)
+        codec, encoder_params = select_encoder(encoder_profile)
+        thread_args = ['-threads', str(threads)] if threads else []
+
         # Construct FFmpeg command
         command = [
-            'ffmpeg',
+            'ffmpeg', '-y', '-v', 'error',
+            *thread_args,  # decoder threads
             '-i', input_path,  # Input file
             '-vf', f'crop={crop_w}:{height}:{crop_x}:0,scale=1080:1920',  # Crop to 9:16 and scale to 1080x1920
-            '-preset', 'fast',  # Quick encoding
-            '-c:v', 'h264_nvenc',  # Use NVIDIA GPU for H.264 encoding (NVENC)
-            '-b:v', '5M',  # Set the video bitrate (optional)
+            *(['-filter_threads', str(threads)] if threads else []),
+            '-c:v', codec,
+            *encoder_params,
+            *thread_args,  # encoder threads
+            '-pix_fmt', 'yuv420p',
+            '-c:a', 'copy',  # the AAC track is already final, don't re-encode it
             output_path  # Output file
         ]
         
         # Run the FFmpeg command and capture errors
-        result = subprocess.run(command, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"❌ FFmpeg error for {input_path}: {result.stderr}")
-            return False
-        else:
-            print(f"✅ Created short: {output_path}")
-            return True
+        with span("short", os.path.basename(input_path), codec=codec, threads=threads) as short_span:
+            start = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"FFmpeg error for {input_path}: {result.stderr}")
+            seconds = time.perf_counter() - start
+
+            bytes_read = os.path.getsize(input_path)
+            mb_per_second = bytes_read / (1024 ** 2) / seconds
+            short_span.set(bytes_read=bytes_read, bytes_written=os.path.getsize(output_path),
+                           mb_per_second=round(mb_per_second, 2))
+            throughput = f"{mb_per_second:.1f} MB/s"
+            if duration:
+                short_span.set(realtime=round(duration / seconds, 2))
+                throughput += f", {duration / seconds:.1f}x realtime"
+
+        print(f"✅ Created short: {output_path} ({seconds:.1f}s, {throughput})")
+        return True
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ Error processing {input_path}: {str(e)}")
         return False
 
 def process_video(args):
     """Process a single video file"""
-    input_path, drive_shorts_path, posted_shorts_path = args
+    input_path, drive_shorts_path, posted_shorts_path, size, threads = args
     
     # Check if the file already exists in either location
     if os.path.exists(drive_shorts_path) or os.path.exists(posted_shorts_path):
@@ -58,11 +96,52 @@ def process_video(args):
     
     # If the short doesn't exist in either location, create it
     print(f"🎬 Converting {os.path.basename(input_path)} to a short...")
-    return convert_to_short(input_path, drive_shorts_path)
+    return convert_to_short(input_path, drive_shorts_path, size=size, threads=threads)
+
+def conversion_plan(videos, thread_budget=None, jobs=None, threads_per_job=4):
+    """(jobs, threads per job) that fit thread_budget threads (all cores by default).
+
+    ffmpeg uses every core per process unless told otherwise, so running one per core
+    oversubscribes the machine many times over. A 1080x1920 encode scales well to about
+    threads_per_job threads, so that many run side by side and split the budget.
+    """
+    thread_budget = thread_budget or multiprocessing.cpu_count()
+    jobs = jobs or max(1, thread_budget // threads_per_job)
+    jobs = max(1, min(jobs, videos))
+    return jobs, max(1, thread_budget // jobs)
+
+def process_videos(video_paths=None, trace_path=None, manifest_path=None, thread_budget=None, jobs=None,
+                   assume_yes=False):
+    """Processes specific videos to create Shorts using parallel processing.
+
+    The list of Shorts to create is confirmed on the terminal first, unless assume_yes.
+
+    thread_budget (all cores by default) is split across `jobs` concurrent ffmpeg processes,
+    see conversion_plan.
+
+    With manifest_path, the videos come from the run manifest's completed renders instead,
+    cards whose Short is already recorded are skipped, and finished Shorts are recorded.
+    """
+    if trace_path:
+        tracing.configure(trace_path)
+    started = time.time()
+
+    manifest = None
+    cards_by_video = {}
+    sizes = {}
+    if manifest_path:
+        manifest = RunManifest(manifest_path)
+        video_paths = []
+        for card, record in manifest.completed("render"):
+            if record.get("short_path") and os.path.isfile(record["short_path"]):
+                continue  # rendered natively in the same pass
+            if manifest.is_done(card, "short"):
+                continue
+            video_paths.append(record["video_path"])
+            cards_by_video[record["video_path"]] = card
+            if record.get("size"):
+                sizes[record["video_path"]] = tuple(record["size"])  # no need to probe what we rendered
 
-def process_videos(video_paths):
-    """Processes specific videos to create Shorts using parallel processing."""
-    
     if not video_paths:
         print("No videos to process.")
         return False
@@ -76,12 +155,12 @@ def process_videos(video_paths):
         # Create the short filename with the new naming scheme
         short_name = f"{base_name}_short.mp4"
         
-        drive_shorts_path = os.path.join("G:\\My Drive\\Prestiged\\Shorts", short_name)
-        posted_shorts_path = os.path.join("G:\\My Drive\\Prestiged\\Posted Shorts", short_name)
+        drive_shorts_path = os.path.join(SHORTS_DIR, short_name)
+        posted_shorts_path = os.path.join(POSTED_SHORTS_DIR, short_name)
         
         # Only add to process_args if the short doesn't exist
         if not (os.path.exists(drive_shorts_path) or os.path.exists(posted_shorts_path)):
-            process_args.append((input_path, drive_shorts_path, posted_shorts_path))
+            process_args.append([input_path, drive_shorts_path, posted_shorts_path, sizes.get(input_path)])
             videos_to_create.append(short_name)
 
     if not videos_to_create:
@@ -96,18 +175,30 @@ def process_videos(video_paths):
         print(f"- {video}")
     
     # Get user confirmation
-    confirm = input("\nWould you like to proceed with creating these shorts? (y/n) ").strip().lower()
-    if confirm != 'y':
+    if not assume_yes and not confirm("\nWould you like to proceed with creating these shorts?"):
         print("❌ Operation cancelled by user")
         return False
 
-    # Determine number of processes to use (leave one CPU core free)
-    num_processes = max(1, multiprocessing.cpu_count() - 1)
-    print(f"\nUsing {num_processes} processes for parallel short creation")
+    # Split a fixed thread budget across the concurrent ffmpeg processes
+    num_processes, threads = conversion_plan(len(process_args), thread_budget, jobs)
+    process_args = [tuple(args) + (threads,) for args in process_args]
+
+    # the plan is the ceiling, the scheduler also keeps the conversions within the free memory
+    scheduler = Scheduler("short", cores=num_processes * threads, threads_per_job=threads, mb_per_job=400,
+                          max_jobs=num_processes)
+    print(f"\nUsing up to {num_processes} processes with {threads} threads each for parallel short creation")
+
+    results = []
+
+    def converted(args, success):
+        input_path, drive_shorts_path = args[0], args[1]
+        if success and manifest and input_path in cards_by_video and os.path.isfile(drive_shorts_path):
+            manifest.mark(cards_by_video[input_path], "short", files=[drive_shorts_path], short_path=drive_shorts_path)
+        results.append(success)
 
     # Process videos in parallel
-    with ProcessPoolExecutor(max_workers=num_processes) as executor:
-        results = list(executor.map(process_video, process_args))
+    with warm_pool(num_processes, initializer=warm_short_worker) as executor:
+        run_admitted(executor, scheduler, process_video, process_args, converted)
 
     # Count successful and failed conversions
     successful = results.count(True)
@@ -115,25 +206,52 @@ def process_videos(video_paths):
     print(f"\nShort creation completed:")
     print(f"✅ Successfully created: {successful}")
     print(f"❌ Failed: {failed}")
+    tracing.get_tracer().print_summary(since=started)
+    scheduler.print_summary()
 
     return successful > 0
 
-def create_shorts():
-    """Create videos and then convert them to shorts"""
+def create_shorts(web_db_url=None, single_pass=True, assume_yes=False):
+    """Create videos and then convert them to shorts.
+
+    With single_pass, the Shorts are rendered natively alongside the videos straight into
+    SHORTS_DIR, so the conversion step only has to pick up anything that is still missing.
+    web_db_url is asked for if None; assume_yes skips the confirmation before converting.
+    """
+    # the render side is only needed here, conversion-only runs never import it
+    import mass_video_maker
+
+    if web_db_url is None:
+        web_db_url = ask("Paste the Yu-Gi-Oh Database URL here: ")
+    manifest_path = manifest_path_for(mass_video_maker.strip_ygoprodeck_url(web_db_url))
+
     # Get list of newly created videos
-    new_videos = mass_video_maker.create_videos()
+    new_videos = mass_video_maker.create_videos(web_db_url, with_short=single_pass, short_dir=SHORTS_DIR,
+                                                manifest_path=manifest_path)
     
     if new_videos:
         print("\nStarting short conversion process...")
-        process_videos(new_videos)
+        # the manifest knows the paths create_video actually wrote
+        process_videos(manifest_path=manifest_path, assume_yes=assume_yes)
         print("✅ Shorts creation process completed")
     else:
         print("❌ No videos were created, skipping short conversion")
 
-if __name__ == "__main__":
-    create_shorts_command = input("Would you like to create shorts? (y/n) ").strip().lower()
+def main():
+    parser = argparse.ArgumentParser(description="Create the videos of a Yu-Gi-Oh database search and their Shorts")
+    parser.add_argument("url", nargs="?", help="Yu-Gi-Oh database search URL (asked for if missing)")
+    parser.add_argument("--yes", action="store_true", help="don't ask before creating or converting anything")
+    parser.add_argument("--two-pass", action="store_true", help="convert the Shorts from the finished videos "
+                                                                "instead of rendering them alongside")
+    args = parser.parse_args()
 
-    if create_shorts_command == "y":
-        create_shorts()
-    else:
-        print("❌ No videos will be created or processed")
+    try:
+        if not args.yes and not confirm("Would you like to create shorts?"):
+            print("❌ No videos will be created or processed")
+            return
+        create_shorts(args.url, single_pass=not args.two_pass, assume_yes=args.yes)
+    except InteractionRequired as e:
+        parser.exit(1, f"❌ {e}\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,23 @@
-import requests
 import os
 import json
 from urllib.parse import urlparse, parse_qs, urlencode
-from yugioh_video_maker import YugiohVideoMaker
+from background_store import BackgroundStore
+import encoders
+from card_db import CardDB
+from pipeline import ApiServices, RENDER_THREADS, error_text, run_pipeline
+import tracing
+from tracing import span
+from manifest import RunManifest, manifest_path_for
+from card_source import iter_cards
+from api_clients import http
+from scheduler import Scheduler, run_admitted
+from worker_pool import warm_pool
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from prompting import InteractionRequired, ask
+import argparse
 import time
+import traceback
 
 def strip_ygoprodeck_url(url):
     parsed_url = urlparse(url)
@@ -20,10 +32,15 @@ def strip_ygoprodeck_url(url):
     stripped_query = urlencode(filtered_params, doseq=True)
     return stripped_query
 
-def process_card(card_data):
-    """Process a single card and create its video"""
+def process_card(card_data, with_short=False, short_dir=None, tts_backend="elevenlabs", raise_errors=False):
+    """Process a single card and create its video (and its Short in the same pass if with_short),
+    narrated with tts_backend. Returns (success, video_path, short_path, error). A failure is
+    printed with its traceback and returned as (False, None, None, error text), or with
+    raise_errors is raised as it is."""
+    from yugioh_video_maker import YugiohVideoMaker
+
+    card_name = card_data.get("name", "Unknown")
     try:
-        card_name = card_data["name"]
         card_effect = card_data["desc"]
         card_readable_type = card_data["humanReadableCardType"]
         card_type = card_data["type"]
@@ -36,64 +53,186 @@ def process_card(card_data):
             card_atk = None
             card_def = None
 
-        # Create a YuGiOhVideoMaker object
-        video_maker = YugiohVideoMaker(
-            card_name=card_name,
-            card_effect=card_effect,
-            card_readable_type=card_readable_type,
-            card_img=image_url,
-            card_type=card_type,
-            card_atk=card_atk,
-            card_def=card_def
-        )
+        # Create a YuGiOhVideoMaker object (this fetches the card art)
+        with span("fetch", card_name):
+            video_maker = YugiohVideoMaker(
+                card_name=card_name,
+                card_effect=card_effect,
+                card_readable_type=card_readable_type,
+                card_img=image_url,
+                card_type=card_type,
+                card_atk=card_atk,
+                card_def=card_def,
+                card_id=card_data.get("id"),
+                # the script below is narrated again through the TTS cache, and a pool worker must never prompt
+                reuse_audio="reuse",
+                match_policy="reject"
+            )
         
-        # Get the script using ChatGPT
-        prompt = video_maker.get_prompt()
-        script = video_maker.get_script_from_chatgpt(prompt)
-        video_maker.set_script(script)
+        # Get the script from the card's template, or from ChatGPT when it needs a summary
+        with span("script", card_name):
+            script = video_maker.get_card_script()
+            video_maker.set_script(script)
         
-        # Create the video
-        video_maker.create_video()
+        # Create the video (records its own tts/audio_mix/render spans)
+        short_path = None
+        if with_short:
+            video_path, short_path = video_maker.create_video(with_short=True, short_dir=short_dir,
+                                                              tts_backend=tts_backend)
+        else:
+            video_path = video_maker.create_video(tts_backend=tts_backend)
         
-        # Return the path of the created video
-        video_name = card_name.replace(' ', '_')
-        video_path = os.path.join('src', 'videos', f"{video_name}.mp4")
-        return (True, video_path)
+        # Return the paths create_video actually wrote
+        return (True, video_path, short_path, None)
     except Exception as e:
-        print(f"Error processing card {card_data.get('name', 'Unknown')}: {str(e)}")
-        return (False, None)
+        if raise_errors:
+            raise
+        print(f"Error processing card {card_name}:\n{traceback.format_exc()}")
+        return (False, None, None, error_text(e))
+
+def create_videos(web_db_url=None, with_short=False, short_dir=os.path.join('src', 'shorts'), staged=True, services=None,
+                  trace_path=None, manifest_path=None, page_size=100, max_cards=None, tts_backend="elevenlabs",
+                  **pipeline_settings):
+    """Creates videos for every card in a Yu-Gi-Oh database search (asked for if web_db_url
+    is None). With with_short, each card's Short is rendered into short_dir in the same pass
+    instead of being converted afterwards.
+
+    staged runs the card through pipeline.run_pipeline, which keeps the network calls out of
+    the render processes; pipeline_settings are passed through to it.
+
+    Progress is checkpointed in a run manifest (by default one per search under
+    src/cache/runs), so rerunning the same search skips every card that is already done.
+
+    trace_path (or the YGO_TRACE environment variable) records a JSON Lines span for every
+    stage of every card and prints p50/p95 per stage at the end.
+
+    With page_size, results are fetched page by page and fed to the workers as they arrive
+    instead of waiting for the whole result set; page_size=None fetches everything at once.
+    max_cards stops after that many cards.
+
+    tts_backend="chattts" narrates with ChatTTS instead of ElevenLabs: one local, batched
+    engine in the staged pipeline, one engine per worker otherwise.
+    """
+    if trace_path:
+        tracing.configure(trace_path)
+    started = time.time()
 
-def create_videos():
     # API URL for fetching cards
-    web_db_url = input("Paste the Yu-Gi-Oh Database URL here: ")
-    api_url_prefix = "https://db.ygoprodeck.com/api/v7/cardinfo.php?"
-    api_url = api_url_prefix + strip_ygoprodeck_url(web_db_url)
-    print(f"Fetching data from: {api_url}")
-
-    response = requests.get(api_url).json()
-
-    # Check if the response contains data
-    if "data" in response:
-        # Determine number of processes to use (leave one CPU core free)
-        num_processes = max(1, multiprocessing.cpu_count() - 1)
-        print(f"Using {num_processes} processes for parallel video creation")
-
-        # Create a process pool and process cards in parallel
-        with ProcessPoolExecutor(max_workers=num_processes) as executor:
-            results = list(executor.map(process_card, response["data"]))
-        
-        # Separate successful and failed results
-        successful_videos = [path for success, path in results if success and path]
-        failed = len([r for r in results if not r[0]])
-        
-        print(f"\nVideo creation completed:")
-        print(f"✅ Successfully created: {len(successful_videos)}")
-        print(f"❌ Failed: {failed}")
-        
-        return successful_videos
+    if web_db_url is None:
+        web_db_url = ask("Paste the Yu-Gi-Oh Database URL here: ")
+    query = strip_ygoprodeck_url(web_db_url)
+
+    manifest = RunManifest(manifest_path or manifest_path_for(query))
+    print(f"Run manifest: {manifest.path}")
+
+    if page_size:
+        # stream the results page by page, cards start rendering as soon as their page arrives
+        cards = iter_cards(query, page_size=page_size, max_cards=max_cards)
+    elif CardDB.available() and CardDB.supports(query):
+        # resolve the search against the local card database, no network round-trip
+        print(f"Querying local card database: {query}")
+        db = CardDB()
+        cards = db.query(query)
+        db.close()
     else:
+        api_url_prefix = "https://db.ygoprodeck.com/api/v7/cardinfo.php?"
+        api_url = api_url_prefix + query
+        print(f"Fetching data from: {api_url}")
+
+        response = http().get(api_url).json()
+        cards = response.get("data", [])
+
+    if not page_size:
+        if not cards:
+            print("No data found or API request failed.")
+            return []
+        if max_cards:
+            cards = cards[:max_cards]
+
+    # At most one process per core (leaving one free); the scheduler lowers that to what the
+    # cores and memory can take and adapts it as renders finish
+    num_processes = max(1, multiprocessing.cpu_count() - 1)
+    scheduler = Scheduler("render", max_jobs=num_processes, threads_per_job=RENDER_THREADS)
+    print(f"Using up to {num_processes} processes for parallel video creation, starting with {scheduler.limit}")
+
+    # Decode the background once up front so the workers only map the shared frame store
+    BackgroundStore.open()
+    # Probe the encoders once so the workers read the cached result
+    encoders.probe()
+
+    if staged:
+        services = services or ApiServices(tts_backend=tts_backend)
+        results = run_pipeline(cards, services, render_processes=num_processes,
+                               with_short=with_short, short_dir=short_dir, manifest=manifest, scheduler=scheduler,
+                               **pipeline_settings)
+    else:
+        results = process_cards(cards, scheduler, manifest, with_short, short_dir, tts_backend)
+
+    if not results:
         print("No data found or API request failed.")
         return []
+    
+    # Separate successful and failed results
+    successful_videos = [video_path for success, video_path, _, _ in results if success and video_path]
+    failed = len([r for r in results if not r[0]])
+    
+    print(f"\nVideo creation completed:")
+    print(f"✅ Successfully created: {len(successful_videos)}")
+    print(f"❌ Failed: {failed}")
+    tracing.get_tracer().print_summary(since=started)
+    scheduler.print_summary()
+    
+    return successful_videos
+
+def process_cards(cards, scheduler, manifest, with_short=False, short_dir=None, tts_backend="elevenlabs"):
+    """Feeds cards to a process pool as the scheduler admits them and collects results in
+    completion order. Cards already rendered in the manifest are skipped."""
+    from raw_render import LANDSCAPE_SIZE
+
+    results = []
+    skipped = 0
+
+    def pending():
+        nonlocal skipped
+        for card in cards:
+            # Skip cards whose video is already done from an earlier run
+            rendered = manifest.stage(card, "render")
+            if rendered:
+                skipped += 1
+                results.append((True, rendered["video_path"], rendered.get("short_path"), None))
+            else:
+                yield card
+
+    def rendered(card, result):
+        success, video_path, short_path, _ = result
+        if success:
+            manifest.mark(card, "render", files=[video_path, short_path],
+                          video_path=video_path, short_path=short_path, size=LANDSCAPE_SIZE)
+        results.append(result)
+
+    with warm_pool(scheduler.max_jobs, initargs=(30, with_short)) as executor:
+        render = partial(process_card, with_short=with_short, short_dir=short_dir, tts_backend=tts_backend)
+        run_admitted(executor, scheduler, render, pending(), rendered)
+
+    print(f"⏭️ {skipped} cards were already done")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the videos of every card in a Yu-Gi-Oh database search")
+    parser.add_argument("url", nargs="?", help="Yu-Gi-Oh database search URL (asked for if missing)")
+    parser.add_argument("--with-short", action="store_true", help="render each card's Short in the same pass")
+    parser.add_argument("--short-dir", default=os.path.join('src', 'shorts'))
+    parser.add_argument("--max-cards", type=int)
+    parser.add_argument("--page-size", type=int, default=100, help="0 fetches the whole search at once")
+    parser.add_argument("--tts-backend", choices=("elevenlabs", "chattts"), default="elevenlabs")
+    parser.add_argument("--trace", help="write per-stage spans to this JSON Lines file")
+    args = parser.parse_args()
+
+    try:
+        create_videos(args.url, with_short=args.with_short, short_dir=args.short_dir, page_size=args.page_size or None,
+                      max_cards=args.max_cards, tts_backend=args.tts_backend, trace_path=args.trace)
+    except InteractionRequired as e:
+        parser.exit(1, f"❌ {e}\n")
 
 if __name__ == "__main__":
-    create_videos()
+    main()
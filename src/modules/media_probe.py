@@ -0,0 +1,41 @@
+import json
+import subprocess
+
+FFPROBE = 'ffprobe'
+
+
+def probe_media(path, ffprobe=FFPROBE):
+    """Reads container/stream headers with ffprobe (no decoding) and returns a flat summary:
+    duration, size, and for the first video/audio stream width, height, fps, video_codec,
+    sample_rate, channels and audio_codec. Missing streams leave their keys out."""
+    command = [
+        ffprobe, '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Error probing {path}: {result.stderr}")
+
+    data = json.loads(result.stdout)
+    fmt = data.get("format", {})
+    info = {
+        "duration": float(fmt["duration"]) if "duration" in fmt else None,
+        "size": int(fmt["size"]) if "size" in fmt else None,
+    }
+
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and "width" not in info:
+            info["width"] = int(stream["width"])
+            info["height"] = int(stream["height"])
+            info["video_codec"] = stream.get("codec_name")
+            rate = stream.get("avg_frame_rate") or stream.get("r_frame_rate") or "0/1"
+            num, den = rate.split("/")
+            info["fps"] = float(num) / float(den) if float(den) else None
+        elif stream.get("codec_type") == "audio" and "sample_rate" not in info:
+            info["sample_rate"] = int(stream["sample_rate"])
+            info["channels"] = int(stream.get("channels", 0))
+            info["audio_codec"] = stream.get("codec_name")
+
+    return info
@@ -0,0 +1,250 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import traceback
+
+from api_clients import get_clients
+from scheduler import Scheduler, measured_call
+from tracing import span
+from worker_pool import warm_pool
+
+
+# what one render keeps busy before anything is measured: the frame loop plus 4 encoder threads
+RENDER_THREADS = 5
+
+
+class ApiServices:
+    """The real external calls: ygoprodeck card art, ChatGPT scripts and ElevenLabs narration.
+
+    Every method is blocking and is run on a thread by the I/O stage. With
+    tts_backend="chattts", narration comes from the local ChatTTS engine instead of
+    ElevenLabs, and tts_concurrency follows its batch size so concurrent cards share one
+    infer call.
+    """
+
+    def __init__(self, secrets_path=None, gpt_model="gpt-4o-mini", tts_backend="elevenlabs"):
+        clients = get_clients(secrets_path)
+
+        self.gpt_model = gpt_model
+        self.tts_backend = tts_backend
+        self.openai_client = clients.openai
+
+        if tts_backend == "chattts":
+            from chatts import get_engine
+
+            self.tts_client = get_engine()
+            self.tts_synthesis = self.tts_client.synthesis
+            self.tts_concurrency = self.tts_client.max_batch
+        elif tts_backend == "elevenlabs":
+            self.tts_client = clients.elevenlabs
+            self.tts_synthesis = {}
+            self.tts_concurrency = 4
+        else:
+            raise ValueError(f"Unknown TTS backend {tts_backend!r}, expected 'elevenlabs' or 'chattts'")
+
+    def fetch_image(self, card):
+        from image_cache import get_card_image
+
+        # only warms the shared image cache, the render worker maps it from there
+        get_card_image(card["card_images"][0]["image_url"])
+
+    def get_script(self, card):
+        from script_cache import card_script
+
+        # Normal Monsters and Extra Deck monsters without an effect are templated locally, no request
+        return card_script(self.openai_client, card, model=self.gpt_model)
+
+    def synthesize(self, card, script):
+        from tts_cache import card_narration
+
+        # duplicate scripts in the batch share one synthesis through the cache
+        return card_narration(self.tts_client, card["name"], script, **self.tts_synthesis)
+
+
+def error_text(e):
+    # the same "Type: message" a span records, so a result and its trace read alike
+    return f"{type(e).__name__}: {e}"
+
+
+def render_card(job):
+    """Render stage, run in the process pool: everything it needs is already on disk.
+
+    Returns (success, video_path, short_path, error), error being the failure's text or None.
+    """
+    from yugioh_video_maker import YugiohVideoMaker
+
+    card, script, audio_path = job["card"], job["script"], job["audio_path"]
+    with_short, short_dir, tts_backend = job["with_short"], job["short_dir"], job["tts_backend"]
+    try:
+        # the whole job, maker construction included, so its failures are traced with their traceback
+        with span("render_job", card.get("name")):
+            video_maker = YugiohVideoMaker(
+                card_name=card["name"],
+                card_effect=card["desc"],
+                card_readable_type=card["humanReadableCardType"],
+                card_img=card["card_images"][0]["image_url"],
+                card_type=card["type"],
+                card_atk=card.get("atk"),
+                card_def=card.get("def"),
+                card_id=card.get("id"),
+                reuse_audio="reuse",  # the I/O stage just narrated it
+                match_policy="reject"  # never prompt in a pool worker
+            )
+            video_maker.set_script(script)
+
+            # render the narration the I/O stage made (with whichever backend), the render workers
+            # never call a TTS service; tts_backend only matters if that file is missing
+            short_path = None
+            if with_short:
+                video_path, short_path = video_maker.create_video(with_short=True, short_dir=short_dir,
+                                                                  narration_path=audio_path, tts_backend=tts_backend)
+            else:
+                video_path = video_maker.create_video(narration_path=audio_path, tts_backend=tts_backend)
+        return (True, video_path, short_path, None)
+    except Exception as e:
+        print(f"Error rendering card {card.get('name', 'Unknown')}:\n{traceback.format_exc()}")
+        return (False, None, None, error_text(e))
+
+
+def traced(stage, card, func, *args):
+    with span(stage, card.get("name")):
+        return func(*args)
+
+
+async def run_stage(semaphore, stage, card, func, *args):
+    async with semaphore:
+        return await asyncio.to_thread(traced, stage, card, func, *args)
+
+
+async def io_worker(services, cards, render_queue, semaphores, results, failures, manifest):
+    image_sem, script_sem, tts_sem = semaphores
+    while True:
+        card = await cards.get()
+        try:
+            if card is None:
+                return
+
+            rendered = manifest.stage(card, "render") if manifest else None
+            if rendered:
+                print(f"⏭️ {card['name']} already rendered, skipping")
+                results.append((True, rendered["video_path"], rendered.get("short_path"), None))
+                continue
+
+            await run_stage(image_sem, "fetch", card, services.fetch_image, card)
+
+            scripted = manifest.stage(card, "script") if manifest else None
+            if scripted:
+                script = scripted["script"]
+            else:
+                script = await run_stage(script_sem, "script", card, services.get_script, card)
+                if manifest:
+                    manifest.mark(card, "script", script=script)
+
+            # cheap when the narration cache already has it, and it puts the card's audio file back in place
+            audio_path = await run_stage(tts_sem, "tts", card, services.synthesize, card, script)
+            if manifest:
+                manifest.mark(card, "tts", files=[audio_path], audio_path=audio_path)
+
+            # blocks while the render stage is behind, which throttles the I/O stage (backpressure)
+            await render_queue.put({"card": card, "script": script, "audio_path": audio_path,
+                                    "tts_backend": getattr(services, "tts_backend", "elevenlabs")})
+        except Exception as e:
+            print(f"Error preparing card {card.get('name', 'Unknown')}:\n{traceback.format_exc()}")
+            failures.append(error_text(e))
+        finally:
+            cards.task_done()
+
+
+async def render_worker(loop, executor, render_queue, results, with_short, short_dir, manifest, scheduler, admission):
+    from raw_render import LANDSCAPE_SIZE
+
+    while True:
+        job = await render_queue.get()
+        try:
+            if job is None:
+                return
+            job = dict(job, with_short=with_short, short_dir=short_dir)
+
+            # wait until the scheduler has cores and memory for one more render
+            async with admission:
+                await admission.wait_for(scheduler.can_admit)
+                scheduler.started()
+            usage = None
+            try:
+                result, usage = await loop.run_in_executor(executor, measured_call, render_card, job)
+            finally:
+                async with admission:
+                    scheduler.finished(usage)
+                    admission.notify_all()
+
+            results.append(result)
+            print(f"{'✅' if result[0] else '❌'} Rendered {job['card']['name']}")
+            if result[0] and manifest:
+                success, video_path, short_path, _ = result
+                manifest.mark(job["card"], "render", files=[video_path, short_path],
+                              video_path=video_path, short_path=short_path, size=LANDSCAPE_SIZE)
+        finally:
+            render_queue.task_done()
+
+
+async def run_pipeline_async(cards, services, render_processes, io_workers=8, image_concurrency=8,
+                             script_concurrency=8, tts_concurrency=None, queue_size=None, with_short=False,
+                             short_dir=os.path.join('src', 'shorts'), manifest=None, scheduler=None):
+    loop = asyncio.get_running_loop()
+    scheduler = scheduler or Scheduler("render", max_jobs=render_processes, threads_per_job=RENDER_THREADS)
+    admission = asyncio.Condition()
+    queue_size = queue_size or render_processes * 2
+    tts_concurrency = tts_concurrency or getattr(services, "tts_concurrency", 4)
+
+    card_queue = asyncio.Queue(maxsize=io_workers * 2)
+    render_queue = asyncio.Queue(maxsize=queue_size)
+    semaphores = (asyncio.Semaphore(image_concurrency), asyncio.Semaphore(script_concurrency),
+                  asyncio.Semaphore(tts_concurrency))
+    results, failures = [], []
+
+    with warm_pool(render_processes, initargs=(30, with_short)) as executor:
+        io_tasks = [asyncio.create_task(io_worker(services, card_queue, render_queue, semaphores, results, failures, manifest))
+                    for _ in range(io_workers)]
+        render_tasks = [asyncio.create_task(render_worker(loop, executor, render_queue, results, with_short, short_dir, manifest,
+                                                           scheduler, admission))
+                        for _ in range(render_processes)]
+
+        # cards may be a lazy page-by-page iterator, so pull it on a thread to keep the loop free
+        iterator = iter(cards)
+        while (card := await asyncio.to_thread(next, iterator, None)) is not None:
+            await card_queue.put(card)
+        for _ in io_tasks:
+            await card_queue.put(None)
+        await asyncio.gather(*io_tasks)
+
+        for _ in render_tasks:
+            await render_queue.put(None)
+        await asyncio.gather(*render_tasks)
+
+    results.extend((False, None, None, error) for error in failures)
+    return results
+
+
+def run_pipeline(cards, services=None, render_processes=None, **settings):
+    """Creates videos for cards with network I/O and rendering in separate stages.
+
+    cards can be any iterable, including card_source.iter_cards, in which case cards start
+    rendering while later pages are still being fetched.
+
+    An asyncio stage fetches card art, scripts and narration with bounded concurrency per
+    service (image_concurrency, script_concurrency, tts_concurrency, io_workers) and hands
+    finished cards through a bounded queue (queue_size) to a process pool that only renders
+    and encodes, so render cores never wait on HTTP. Pass stub_services.StubServices() as
+    services to run offline. With a manifest (manifest.RunManifest), stages that are already
+    done and still valid are skipped. A scheduler.Scheduler decides how many of the
+    render_processes actually render at once. Returns a list of (success, video_path, short_path,
+    error) like process_card.
+    """
+    services = services or ApiServices()
+    render_processes = render_processes or max(1, multiprocessing.cpu_count() - 1)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_pipeline_async(cards, services, render_processes, **settings))
+    print(f"⏱️ Pipeline finished {len(results)} cards in {time.perf_counter() - start:.1f}s")
+    return results
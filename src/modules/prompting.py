@@ -0,0 +1,31 @@
+import sys
+
+
+class InteractionRequired(Exception):
+    """Raised instead of prompting when there is no terminal to answer, e.g. in a pool worker"""
+
+
+def interactive():
+    """Whether a person can answer a prompt: stdin is a terminal (worker processes get /dev/null)"""
+    try:
+        return sys.stdin is not None and sys.stdin.isatty()
+    except ValueError:  # closed stdin
+        return False
+
+
+def ask(question):
+    """input() that fails fast with InteractionRequired when nobody can answer it"""
+    if not interactive():
+        raise InteractionRequired(f"{question.strip()!r} needs an answer but stdin is not a terminal, "
+                                  "pass the matching policy instead")
+    return input(question).strip()
+
+
+def confirm(question):
+    return ask(f"{question} (y/n) ").lower() == "y"
+
+
+def check_policy(name, value, allowed):
+    if value not in allowed:
+        raise ValueError(f"Unknown {name} {value!r}, expected one of {', '.join(map(repr, allowed))}")
+    return value
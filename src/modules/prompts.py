@@ -0,0 +1,63 @@
+from script_template import spoken_name, spoken_text, spoken_type
+
+
+def build_prompt(card_name, card_effect, card_readable_type, context=None, adjustments=None):
+    """The ChatGPT prompt for a card's script. Kept outside YugiohVideoMaker so batch script
+    generation can build prompts straight from card data.
+
+    The card details are already normalized by script_template (numbers spelled out, ATK/DEF,
+    Xyz, LV and & replaced, special characters dropped from the name), so the model only has
+    to write, not apply the mechanical rules."""
+    card_name = spoken_name(card_name)
+    card_effect = spoken_text(card_effect)
+    card_readable_type = spoken_type(card_readable_type)
+    return f"""
+        Write an engaging YouTube Short script about this Yu-Gi-Oh! card, explaining what it does. I may provide you with optional context that you should use to make the script more engaging. IF I don't provide any context, just follow the base script.
+
+        ### Base Script (Mandatory Formatting):
+        Follow this structure when generating the script:
+
+        - If the {card_readable_type} is a **Normal Monster**, follow this format:
+        "[Name] is a [Card Type] whose flavor text reads, {{read the [Effect] word for word}}."
+
+        - Otherwise, use this structure without extra commentary—stick to describing the card:
+        "[Name] is a [Card Type] that {{summarize the [Effect]}}."
+
+        ### Rules:
+        1. Keep the tone semi-neutral and engaging—**avoid being corny**.
+        2. Use **simple, easy-to-understand vocabulary** (e.g., "strong" instead of "formidable").
+        3. **Spell out numbers fully** (e.g., "four" instead of "4").
+        4. Replace:
+        - **ATK → attack**
+        - **DEF → defense**
+        5. **Pronunciation Rules (FOLLOW THESE STRICTLY):**
+        - If the [Effect] and/or [Card Type] contains **"Xyz"**, rewrite it as **"ekseez."**
+        - If **"XYZ"** appears in the card [Name], **leave it unchanged**.
+        - **If the card [Name] starts with "CXyz", rewrite it as "see ekseez"—NEVER say "CXyz".**
+        6. Never refer to a **Monster** card as a "creature"—**always use "monster."**
+        7. If the [Card Type] is a Fusion, Synchro, Xyz, Ritual, Pendulum, or Link monster and the only text in the [Effect] is summoning requirements, mention only its **attack** and **defense.**
+        8. If the [Card Type] is a Spell/Trap, **do not mention attack or defense.**
+
+        9. **Name Formatting Rules (FOLLOW THESE STRICTLY):**
+        - **Remove all special characters** from the [Name] in spoken output.
+            - Example: "Danger!? Tsuchinoko?" → "Danger Tsuchinoko."
+        - **Replace "&" with "and."**
+            - Example: "Ash & Leo" → "Ash and Leo."
+        - **If the card [Name] contains "LV", rewrite it as "level."**
+            - Example: "Armed Dragon LV10" → "Armed Dragon Level Ten."
+
+        10. **Do not ignore or alter these rules. These are mandatory replacements.**
+        11. **If I provide you with adjustments, that means you have already written a script and it was bad. Keep those adjustments in mind when writing the next script.**
+
+        ---
+        ### Card Details:
+        Name: {card_name}
+        Effect: {card_effect}
+        Card Type: {card_readable_type}
+
+        ### Optional Context:
+        {context}
+
+        ### Adjustments:
+        {adjustments}
+        """
@@ -0,0 +1,221 @@
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from background_store import BackgroundStore
+from card_animation import CardFrameCache, card_scale_at
+from tracing import current_span
+
+FFMPEG = 'ffmpeg'
+LANDSCAPE_SIZE = (1920, 1080)
+
+
+def center_rect(frame_shape, card_shape):
+    """(dst_y, dst_x, src_y, src_x, h, w) placing card at the center of frame, clipped to the frame"""
+    frame_h, frame_w = frame_shape[:2]
+    card_h, card_w = card_shape[:2]
+
+    x = (frame_w - card_w) // 2
+    y = (frame_h - card_h) // 2
+
+    src_x, src_y = max(0, -x), max(0, -y)
+    dst_x, dst_y = max(0, x), max(0, y)
+    w = min(card_w - src_x, frame_w - dst_x)
+    h = min(card_h - src_y, frame_h - dst_y)
+    return dst_y, dst_x, src_y, src_x, h, w
+
+
+class FrameTimings:
+    """Seconds the frame loop spends per step: card_transform (animating and resizing the card),
+    composite (drawing it over the background) and encode (handing frames to ffmpeg and waiting
+    for it to finish). lap(step) adds the time since the previous lap to step."""
+
+    STEPS = ("card_transform", "composite", "encode")
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(self.STEPS, 0.0)
+        self.last = time.perf_counter()
+
+    def lap(self, step):
+        now = time.perf_counter()
+        self.seconds[step] += now - self.last
+        self.last = now
+
+    def add(self, seconds):
+        for step, value in seconds.items():
+            self.seconds[step] += value
+
+    def record(self, span=None):
+        """Sets <step>_seconds on span (the render span open on this thread by default)"""
+        (span or current_span()).set(**{f"{step}_seconds": round(value, 4) for step, value in self.seconds.items()})
+
+
+def blit_center(frame, card):
+    """Copies card onto the center of frame in place, clipping it if it is larger than the frame."""
+    dst_y, dst_x, src_y, src_x, h, w = center_rect(frame.shape, card.shape)
+    frame[dst_y:dst_y + h, dst_x:dst_x + w] = card[src_y:src_y + h, src_x:src_x + w, :3]
+    return frame
+
+
+class CardCompositor:
+    """Composites a centered card over a background store into one preallocated frame.
+
+    Only what changed since the previous frame is written: a new background frame is copied
+    around the card (the card covers the rest), an unchanged background only has the old
+    card area restored, and an unchanged card on an unchanged background is not touched.
+    """
+
+    def __init__(self, store):
+        width, height = store.size
+        self.store = store
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.background_index = None
+        self.card = None
+        self.rect = None  # (y0, y1, x0, x1) of the card on the frame
+
+    def compose(self, t, card):
+        index = self.store.frame_index(t)
+        background = self.store.frames[index]
+        frame = self.frame
+
+        dst_y, dst_x, src_y, src_x, h, w = center_rect(frame.shape, card.shape)
+        rect = (dst_y, dst_y + h, dst_x, dst_x + w)
+
+        if index != self.background_index:
+            y0, y1, x0, x1 = rect
+            frame[:y0] = background[:y0]
+            frame[y1:] = background[y1:]
+            frame[y0:y1, :x0] = background[y0:y1, :x0]
+            frame[y0:y1, x1:] = background[y0:y1, x1:]
+        elif card is not self.card:
+            if self.rect:
+                y0, y1, x0, x1 = self.rect
+                frame[y0:y1, x0:x1] = background[y0:y1, x0:x1]
+        else:
+            return frame
+
+        frame[rect[0]:rect[1], rect[2]:rect[3]] = card[src_y:src_y + h, src_x:src_x + w, :3]
+        self.background_index, self.card, self.rect = index, card, rect
+        return frame
+
+
+class RawVideoPipe:
+    """An ffmpeg encoder fed raw rgb24 frames over stdin.
+
+    Frames are written straight from their buffers, without a per-frame bytes copy. The
+    audio file, if any, is muxed in by the same ffmpeg: re-encoded with audio_codec, or
+    copied as-is with audio_codec="copy". chapters_path is an FFMETADATA file whose
+    chapters and title are written into the output.
+    """
+
+    def __init__(self, path, size, fps, codec="libx264", ffmpeg_params=None, audio_path=None, audio_codec="aac",
+                 audio_bitrate="192k", threads=None, chapters_path=None, ffmpeg=FFMPEG):
+        width, height = size
+        self.path = path
+        command = [
+            ffmpeg, '-y', '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', '-'
+        ]
+        # every input goes before the output options, ffmpeg applies options to the next file
+        if audio_path:
+            command += ['-i', audio_path]
+        if chapters_path:
+            command += ['-i', chapters_path]
+        if audio_path:
+            command += ['-map', '0:v', '-map', '1:a', '-shortest']
+            if audio_codec == "copy":
+                command += ['-c:a', 'copy']
+            else:
+                command += ['-c:a', audio_codec, '-b:a', audio_bitrate]
+        if chapters_path:
+            metadata_input = '2' if audio_path else '1'
+            command += ['-map_metadata', metadata_input, '-map_chapters', metadata_input]
+        command += ['-c:v', codec, *(ffmpeg_params or []), '-pix_fmt', 'yuv420p']
+        if threads:
+            command += ['-threads', str(threads)]
+        command.append(path)
+
+        # ffmpeg's log goes to a file, a full stderr pipe would stall the encoder
+        self.log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self.log)
+
+    def write(self, frame):
+        try:
+            self.proc.stdin.write(frame.data)
+        except BrokenPipeError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.proc.wait()
+        self.log.seek(0)
+        log = self.log.read().decode(errors='replace')
+        self.log.close()
+        if returncode != 0:
+            raise Exception(f"Error encoding {self.path}: {log}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # the encode already failed, don't let ffmpeg's error hide the original one
+            self.proc.kill()
+            self.proc.wait()
+            self.log.close()
+        return False
+
+
+def render_card_video(card_img, audio_path, duration, video_path, fps=30, codec="libx264", ffmpeg_params=None,
+                      threads=4, rotation_start=90, flip_axis='x', rotation_end=0, flip_duration_ratio=0.03,
+                      start_scale=0.4, end_scale=0.7):
+    """Renders the 16:9 card video: the flip-then-zoom card over the background store, streamed
+    as raw frames into ffmpeg with the mixed audio muxed in. The time per step of the frame
+    loop is recorded on the open span (see FrameTimings). Returns video_path."""
+    card_img = np.ascontiguousarray(card_img[:, :, :3])
+    compositor = CardCompositor(BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps))
+    cards = CardFrameCache(card_img)
+
+    with RawVideoPipe(video_path, LANDSCAPE_SIZE, fps, codec=codec, ffmpeg_params=ffmpeg_params,
+                      audio_path=audio_path, threads=threads) as pipe:
+        timings = FrameTimings()
+        for i in range(int(duration * fps)):
+            t = i / fps
+            scale_x, scale_y, angle = card_scale_at(t, duration, rotation_start, rotation_end, flip_axis,
+                                                    flip_duration_ratio, start_scale, end_scale)
+            card = cards.get_scaled(scale_x, scale_y, angle)
+            timings.lap("card_transform")
+            frame = compositor.compose(t, card)
+            timings.lap("composite")
+            pipe.write(frame)
+            timings.lap("encode")
+    timings.lap("encode")
+    timings.record()
+
+    return video_path
+
+
+def encode_audio(audio_path, output_path, bitrate="192k", ffmpeg=FFMPEG):
+    """Encodes audio_path to AAC once, so several outputs can copy the same stream"""
+    command = [ffmpeg, '-y', '-v', 'error', '-i', audio_path, '-c:a', 'aac', '-b:a', bitrate, output_path]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Error encoding audio {audio_path}: {result.stderr}")
+    return output_path
+
+
+def temp_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
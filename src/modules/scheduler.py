@@ -0,0 +1,294 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def available_memory_mb():
+    """Memory the OS can hand out right now, or None if it can't be read on this platform"""
+    if psutil is not None:
+        return psutil.virtual_memory().available / 1024 ** 2
+    if os.path.isfile('/proc/meminfo'):
+        with open('/proc/meminfo', 'r') as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / 1024 ** 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def private_mb(pid):
+    """Memory this process holds for itself, in MB: its anonymous pages (heap, frame buffers)
+    and their swap, with pages still shared with the parent it was forked from counted in
+    proportion. Pages mapped from files (the background store, cached PCM, card art) are
+    left out, even while they are dirty in the page cache. None if it can't be read."""
+    try:
+        fields = {}
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0])
+        # Pss_Anon and SwapPss need Linux 5.x, older kernels only have the unshared totals
+        anonymous = fields["Pss_Anon"] if "Pss_Anon" in fields else fields["Anonymous"]
+        return (anonymous + fields.get("SwapPss", fields.get("Swap", 0))) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_full_info().uss / 1024 ** 2
+        except (psutil.Error, OSError):
+            pass
+    return None
+
+
+def child_pids(pid):
+    """Every descendant of pid (e.g. the ffmpeg processes a render started)"""
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    parents = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as file:
+                # the command name in parentheses may contain spaces, the parent pid follows it
+                parents[int(entry)] = int(file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    children, pending = [], [pid]
+    while pending:
+        parent = pending.pop()
+        found = [child for child, ppid in parents.items() if ppid == parent]
+        children.extend(found)
+        pending.extend(found)
+    return children
+
+
+class MemorySampler:
+    """Samples the private memory of this process (above what it held when started) plus that
+    of its descendants every `interval` seconds, and keeps the peak in MB. peak_mb is None
+    where private memory can't be read."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.pid = os.getpid()
+        self.baseline = private_mb(self.pid)
+        self.peak_mb = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self):
+        if self.baseline is None:
+            return
+        total = max(0.0, (private_mb(self.pid) or self.baseline) - self.baseline)
+        for child in child_pids(self.pid):
+            total += private_mb(child) or 0.0
+        self.peak_mb = total if self.peak_mb is None else max(self.peak_mb, total)
+
+    def run(self):
+        while True:
+            self.sample()
+            if self.stopped.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        return False
+
+
+def measured_call(func, *args):
+    """Runs func(*args) in a worker process and returns (result, usage).
+
+    usage has the wall seconds, the CPU threads the job kept busy on average (the worker plus
+    the ffmpeg processes it waited for) and the peak private memory of the job in MB: what
+    the worker allocated for it plus its ffmpeg processes, sampled while it runs. Lifetime
+    peak RSS would count the shared, memory-mapped frame store and PCM once per job and keep
+    growing with every job the worker has run. peak_mb is None where private memory can't be
+    read, and usage is None where the resource module is missing.
+    """
+    if resource is None:
+        return func(*args), None
+
+    start = time.perf_counter()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with MemorySampler() as memory:
+        result = func(*args)
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    seconds = time.perf_counter() - start
+
+    cpu = sum(after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+              for before, after in ((self_before, self_after), (children_before, children_after)))
+    return result, {
+        "seconds": seconds,
+        "threads": cpu / seconds if seconds > 0 else 0.0,
+        "peak_mb": memory.peak_mb,
+    }
+
+
+class Scheduler:
+    """Decides how many jobs of one kind run at once, within a core and a memory budget.
+
+    It starts from an estimate of the CPU threads and peak memory per job and refines both
+    from what finished jobs actually used (see measured_call), so the limit never exceeds
+    cores / threads_per_job or memory_mb / mb_per_job. Within that cap it probes upwards
+    one job at a time and backs off again when throughput drops. Every change is recorded
+    with its reason in `decisions` and printed by print_summary.
+    """
+
+    def __init__(self, name, cores=None, memory_mb=None, threads_per_job=4.0, mb_per_job=800.0, max_jobs=None,
+                 reserve_mb=1024):
+        self.name = name
+        self.cores = cores or os.cpu_count() or 1
+        if memory_mb is None:
+            available = available_memory_mb()
+            memory_mb = max(0.0, available - reserve_mb) if available is not None else None
+        self.memory_mb = memory_mb
+        self.threads_per_job = float(threads_per_job)
+        self.mb_per_job = float(mb_per_job)
+        self.max_jobs = max_jobs or self.cores
+
+        self.running = 0
+        self.completed = 0
+        self.started_at = time.perf_counter()
+        self.window_start = self.started_at
+        self.window_done = 0
+        self.last_throughput = None
+        self.last_step = 0
+        self.decisions = []
+
+        self.limit = 0
+        self.decide(self.resource_limit(), "initial estimate")
+
+    def resource_limit(self):
+        by_cpu = max(1, round(self.cores / max(self.threads_per_job, 0.1)))
+        by_memory = max(1, int(self.memory_mb // self.mb_per_job)) if self.memory_mb is not None else by_cpu
+        return max(1, min(by_cpu, by_memory, self.max_jobs))
+
+    def decide(self, limit, reason, throughput=None):
+        self.last_step = limit - self.limit
+        self.limit = limit
+        self.decisions.append({
+            "at": round(time.perf_counter() - self.started_at, 2),
+            "limit": limit,
+            "reason": reason,
+            "threads_per_job": round(self.threads_per_job, 2),
+            "mb_per_job": round(self.mb_per_job),
+            "jobs_per_min": round(throughput, 2) if throughput is not None else None,
+        })
+
+    def can_admit(self):
+        return self.running < self.limit
+
+    def started(self):
+        self.running += 1
+
+    def finished(self, usage=None):
+        self.running -= 1
+        self.completed += 1
+        self.window_done += 1
+        if usage:
+            self.threads_per_job = 0.7 * self.threads_per_job + 0.3 * usage["threads"]
+            if usage.get("peak_mb") is not None:
+                # memory spikes are what push a box into swap, so a larger peak is taken as is
+                self.mb_per_job = max(usage["peak_mb"], 0.9 * self.mb_per_job + 0.1 * usage["peak_mb"])
+        self.adapt()
+
+    def adapt(self):
+        cap = self.resource_limit()
+        if cap < self.limit:
+            self.decide(cap, "measured threads/memory per job exceed the budget")
+            self.reset_window()
+            return
+
+        # judge throughput over at least one full round of jobs at the current limit
+        if self.window_done < self.limit:
+            return
+        elapsed = time.perf_counter() - self.window_start
+        throughput = self.window_done / elapsed * 60 if elapsed > 0 else 0.0
+
+        if self.last_throughput is not None and self.last_step > 0 and throughput < self.last_throughput * 0.95:
+            self.decide(self.limit - 1, "throughput dropped after the last increase", throughput)
+        elif self.limit < cap and (self.last_throughput is None or throughput >= self.last_throughput * 0.95):
+            self.decide(self.limit + 1, "budget allows another job", throughput)
+        else:
+            self.last_step = 0
+        self.last_throughput = throughput
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_start = time.perf_counter()
+        self.window_done = 0
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "cores": self.cores,
+            "memory_mb": round(self.memory_mb) if self.memory_mb is not None else None,
+            "limit": self.limit,
+            "threads_per_job": round(self.threads_per_job, 2),
+            "mb_per_job": round(self.mb_per_job),
+            "jobs": self.completed,
+            "decisions": self.decisions,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        memory = f"{summary['memory_mb']} MB" if summary["memory_mb"] is not None else "unknown memory"
+        print(f"\n🧮 {self.name} scheduler: {summary['cores']} cores, {memory}, "
+              f"{summary['threads_per_job']} threads and {summary['mb_per_job']} MB per job, "
+              f"{summary['jobs']} jobs, ending at {summary['limit']} at a time")
+        for decision in self.decisions:
+            throughput = f" at {decision['jobs_per_min']} jobs/min" if decision["jobs_per_min"] is not None else ""
+            print(f"  {decision['at']:>8.1f}s -> {decision['limit']} jobs: {decision['reason']}{throughput}")
+
+
+def run_admitted(executor, scheduler, func, items, on_result):
+    """Submits func(item) for every item once the scheduler admits it, and calls
+    on_result(item, result) as jobs finish, in completion order."""
+    in_flight = {}
+
+    def collect(done):
+        for future in done:
+            item = in_flight.pop(future)
+            result, usage = future.result()
+            scheduler.finished(usage)
+            on_result(item, result)
+
+    for item in items:
+        while not scheduler.can_admit():
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        in_flight[executor.submit(measured_call, func, item)] = item
+        scheduler.started()
+
+    while in_flight:
+        collect(wait(in_flight).done)
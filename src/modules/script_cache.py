@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api_clients import call_with_retries, limiter_for
+from prompts import build_prompt
+from script_template import spoken_text, template_script
+
+CACHE_DIR = os.path.join('src', 'cache', 'scripts')
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+def script_key(prompt, model, card_id):
+    payload = json.dumps([prompt, model, card_id], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached_script(prompt, model, card_id, cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, f"{script_key(prompt, model, card_id)}.json")
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)["script"]
+    except (ValueError, KeyError):
+        return None
+
+
+def save_script(prompt, model, card_id, script, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{script_key(prompt, model, card_id)}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({"card_id": card_id, "model": model, "script": script}, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def request_script(client, prompt, model=DEFAULT_MODEL):
+    chat_completion = client.chat.completions.create(
+        messages=[
+            {
+                "role" : "user",
+                "content" : prompt
+            }
+        ], model=model,
+    )
+    # the model doesn't always follow the pronunciation rules, so they are applied to its output too
+    return spoken_text(chat_completion.choices[0].message.content)
+
+
+def get_script(client, prompt, card_id, model=DEFAULT_MODEL, cache_dir=CACHE_DIR):
+    """Returns the cached script for (prompt, model, card), asking ChatGPT only on a miss"""
+    script = get_cached_script(prompt, model, card_id, cache_dir)
+    if script is None:
+        script = call_with_retries(request_script, client, prompt, model, limiter=limiter_for("openai"))
+        save_script(prompt, model, card_id, script, cache_dir)
+    return script
+
+
+def card_template(card):
+    return template_script(card["name"], card["desc"], card["humanReadableCardType"], card.get("atk"), card.get("def"))
+
+
+def card_script(client, card, model=DEFAULT_MODEL, cache_dir=CACHE_DIR):
+    """The script of a cardinfo.php card dict: built locally from the template when the card
+    needs no summary (see script_template), otherwise get_script on its prompt"""
+    script = card_template(card)
+    if script is None:
+        prompt = build_prompt(card["name"], card["desc"], card["humanReadableCardType"])
+        script = get_script(client, prompt, card.get("id"), model, cache_dir)
+    return script
+
+
+def generate_scripts(cards, client, model=DEFAULT_MODEL, max_in_flight=8, cache_dir=CACHE_DIR):
+    """Yields (card, script) for a list of cardinfo.php card dicts as the scripts complete.
+
+    Template and cached scripts are yielded straight away; the rest are requested concurrently with at
+    most max_in_flight chat completions open at once. Point the OpenAI client at a local
+    stub (see stub_services.py) to run this offline.
+    """
+    pending = []
+    for card in cards:
+        script = card_template(card)
+        if script is not None:
+            yield card, script
+            continue
+
+        prompt = build_prompt(card["name"], card["desc"], card["humanReadableCardType"])
+        script = get_cached_script(prompt, model, card.get("id"), cache_dir)
+        if script is None:
+            pending.append((card, prompt))
+        else:
+            yield card, script
+
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {executor.submit(call_with_retries, request_script, client, prompt, model, limiter=limiter_for("openai")): (card, prompt)
+                   for card, prompt in pending}
+        for future in as_completed(futures):
+            card, prompt = futures[future]
+            try:
+                script = future.result()
+            except Exception as e:
+                print(f"❌ Error getting script for {card['name']}: {str(e)}")
+                yield card, None
+                continue
+            save_script(prompt, model, card.get("id"), script, cache_dir)
+            yield card, script
@@ -0,0 +1,135 @@
+import re
+
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+        "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand"), (100, "hundred")]
+ORDINALS = {"one": "first", "two": "second", "three": "third", "five": "fifth", "eight": "eighth", "nine": "ninth",
+            "twelve": "twelfth"}
+
+# monster kinds whose text is only their summoning requirements when they have no effect
+EXTRA_DECK_KINDS = ("Fusion", "Synchro", "Xyz", "XYZ", "Link")
+
+
+def spell_number(n):
+    """4 -> "four", 2500 -> "two thousand five hundred", 39 -> "thirty-nine" """
+    if n < 0:
+        return "minus " + spell_number(-n)
+    if n < 20:
+        return ONES[n]
+    if n < 100:
+        return TENS[n // 10] + ("-" + ONES[n % 10] if n % 10 else "")
+    for scale, word in SCALES:
+        if n >= scale:
+            rest = spell_number(n % scale) if n % scale else ""
+            return f"{spell_number(n // scale)} {word}" + (f" {rest}" if rest else "")
+
+
+def spell_ordinal(n):
+    """2 -> "second", 21 -> "twenty-first", 40 -> "fortieth" """
+    words = spell_number(n)
+    last = re.search(r"[a-z]+$", words)
+    word = last.group()
+    if word in ORDINALS:
+        word = ORDINALS[word]
+    elif word.endswith("y"):
+        word = word[:-1] + "ieth"
+    else:
+        word += "th"
+    return words[:last.start()] + word
+
+
+def spell_numbers(text, title=False):
+    """Spells out every number in text: "1+" -> "one or more", "2nd" -> "second", "1,000" -> "one thousand" """
+    def number(match):
+        n = int(match.group(1).replace(",", ""))
+        if match.group(2):
+            words = spell_ordinal(n)
+        else:
+            words = spell_number(n) + (" or more" if match.group(3) else "")
+        return words.title() if title else words
+
+    return re.sub(r"(\d{1,3}(?:,\d{3})+|\d+)(?:(st|nd|rd|th)\b|(\+))?", number, text)
+
+
+def pronounce(text):
+    """The pronunciation rules shared by names, card types and card text"""
+    text = re.sub(r"\bCXyz\b", "see ekseez", text)
+    # "XYZ" in capitals is part of a name and stays as it is
+    text = re.sub(r"\bXyz\b", "ekseez", text)
+    text = re.sub(r"\bLV\s*(?=\d)", "Level ", text)
+    text = re.sub(r"\bLV\b", "Level", text)
+    text = text.replace("&", " and ")
+    return text
+
+
+def spoken_name(card_name):
+    """A card name as the narrator should say it: "Armed Dragon LV10" -> "Armed Dragon Level Ten",
+    "Danger!? Tsuchinoko?" -> "Danger Tsuchinoko", "Ash & Leo" -> "Ash and Leo" """
+    name = pronounce(card_name)
+    # "C39" reads as "C Thirty-Nine"
+    name = re.sub(r"(?<=[A-Za-z])(?=\d)", " ", name)
+    # drop special characters, keeping apostrophes inside words ("Harpie's")
+    name = re.sub(r"[^\w\s']|_|(?<!\w)'|'(?!\w)", " ", name)
+    name = spell_numbers(name, title=True)
+    return " ".join(name.split())
+
+
+def spoken_type(card_readable_type):
+    return " ".join(pronounce(card_readable_type).split())
+
+
+def spoken_text(text):
+    """Card text (or a finished script) with ATK/DEF, Xyz, LV, & and numbers spelled the way they are said"""
+    text = re.sub(r"\bATK\s*/\s*DEF\b", "attack and defense", text)
+    text = re.sub(r"\bATK\b", "attack", text)
+    text = re.sub(r"\bDEF\b", "defense", text)
+    text = pronounce(text)
+    text = text.replace("●", "")
+    text = spell_numbers(text)
+    return " ".join(text.split())
+
+
+def with_article(words):
+    if words[:1].lower() in "aeio" or (words[:1].lower() == "u" and not words.lower().startswith("uni")):
+        return f"an {words}"
+    return f"a {words}"
+
+
+def is_normal_monster(card_readable_type):
+    kinds = card_readable_type.split()
+    return "Normal" in kinds and "Monster" in kinds and "Pendulum" not in kinds
+
+
+def is_stat_only(card_readable_type, card_effect):
+    """An Extra Deck monster without an effect, whose text only lists its materials"""
+    kinds = card_readable_type.split()
+    return (any(kind in kinds for kind in EXTRA_DECK_KINDS) and "Effect" not in kinds and "Pendulum" not in kinds
+            and "\n" not in card_effect.strip())
+
+
+def stat(value):
+    # ygoprodeck has "?" stats as -1
+    return "unknown" if value is None or value < 0 else spell_number(value)
+
+
+def template_script(card_name, card_effect, card_readable_type, atk=None, defense=None):
+    """The finished script of a card that needs no summary: a Normal Monster reads its flavor
+    text word for word, an Extra Deck monster without an effect only states its attack (and
+    defense). None for every other card, whose script has to be written by the LLM."""
+    name = spoken_name(card_name)
+    card_type = spoken_type(card_readable_type)
+
+    if is_normal_monster(card_readable_type):
+        flavor = spoken_text(card_effect)
+        if flavor.rstrip(')"\'')[-1:] not in ".!?":
+            flavor += "."
+        return f"{name} is {with_article(card_type)} whose flavor text reads, {flavor}"
+
+    if is_stat_only(card_readable_type, card_effect) and atk is not None:
+        if "Link" in card_readable_type.split():
+            return f"{name} is {with_article(card_type)} with {stat(atk)} attack."
+        if defense is not None:
+            return f"{name} is {with_article(card_type)} with {stat(atk)} attack and {stat(defense)} defense."
+
+    return None
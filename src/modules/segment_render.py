@@ -0,0 +1,139 @@
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from background_store import BackgroundStore
+from card_animation import CardFrameCache, card_scale_at
+from encoders import session_limit
+from raw_render import FFMPEG, LANDSCAPE_SIZE, CardCompositor, FrameTimings, RawVideoPipe, render_card_video
+
+
+def segment_ranges(frame_count, segments):
+    """Splits [0, frame_count) into `segments` contiguous (start, end) frame ranges of nearly equal length,
+    none of them empty (so no ranges at all for no frames)"""
+    if frame_count <= 0:
+        return []
+    segments = max(1, min(segments, frame_count))
+    length = max(1, math.ceil(frame_count / segments))
+    return [(start, min(start + length, frame_count)) for start in range(0, frame_count, length)]
+
+
+def render_segment(job):
+    """Renders frames [start, end) of the card video to a video-only file. Run in a worker process;
+    the segment starts on a keyframe because it is a separate encode. Returns (path, seconds per
+    step of the frame loop)."""
+    card_img, duration, fps, start, end, path, codec, ffmpeg_params, threads, animation = (
+        job["card_img"], job["duration"], job["fps"], job["start"], job["end"], job["path"],
+        job["codec"], job["ffmpeg_params"], job["threads"], job["animation"])
+
+    compositor = CardCompositor(BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps))
+    cards = CardFrameCache(card_img)
+
+    with RawVideoPipe(path, LANDSCAPE_SIZE, fps, codec=codec, ffmpeg_params=ffmpeg_params, threads=threads) as pipe:
+        timings = FrameTimings()
+        for i in range(start, end):
+            # the animation runs on the timeline of the whole video, not of the segment
+            t = i / fps
+            scale_x, scale_y, angle = card_scale_at(t, duration, **animation)
+            card = cards.get_scaled(scale_x, scale_y, angle)
+            timings.lap("card_transform")
+            frame = compositor.compose(t, card)
+            timings.lap("composite")
+            pipe.write(frame)
+            timings.lap("encode")
+    timings.lap("encode")
+    return path, timings.seconds
+
+
+def concat_segments(segment_paths, audio_path, output_path, audio_bitrate="192k", ffmpeg=FFMPEG):
+    """Joins video-only segments with the concat demuxer (no video re-encode) and muxes the audio in once"""
+    list_fd, list_path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(list_fd, 'w', encoding='utf-8') as file:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                file.write(f"file '{escaped}'\n")
+
+        command = [
+            ffmpeg, '-y', '-v', 'error',
+            '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-i', audio_path,
+            '-map', '0:v', '-map', '1:a',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', audio_bitrate,
+            '-shortest',
+            '-movflags', '+faststart',
+            output_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"Error joining segments into {output_path}: {result.stderr}")
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+def render_card_video_segmented(card_img, audio_path, duration, video_path, fps=30, codec="libx264",
+                                ffmpeg_params=None, segments=None, rotation_start=90, flip_axis='x', rotation_end=0,
+                                flip_duration_ratio=0.03, start_scale=0.4, end_scale=0.7):
+    """Renders the same video as raw_render.render_card_video, split into `segments` parts that
+    are composited and encoded in parallel processes, then joined without re-encoding.
+
+    Meant for one card at a time (a re-render, the interactive maker): a batch already keeps
+    every core busy with one card per process. Each segment gets an equal share of the CPU
+    threads for its encoder. Hardware encoders limit concurrent sessions, so with one the
+    segments are capped at encoders.session_limit(codec).
+    """
+    cpus = os.cpu_count() or 1
+    segments = segments or max(1, cpus - 1)
+    sessions = session_limit(codec)
+    if sessions and segments > sessions:
+        print(f"🟡 {codec} allows {sessions} encodes at once, rendering {sessions} segments instead of {segments}")
+        segments = sessions
+    card_img = np.ascontiguousarray(card_img[:, :, :3])
+    frame_count = int(duration * fps)
+    ranges = segment_ranges(frame_count, segments)
+
+    animation = dict(rotation_start=rotation_start, flip_axis=flip_axis, rotation_end=rotation_end,
+                     flip_duration_ratio=flip_duration_ratio, start_scale=start_scale, end_scale=end_scale)
+    if not ranges:
+        # audio shorter than one frame, nothing to split
+        return render_card_video(card_img, audio_path, duration, video_path, fps=fps, codec=codec,
+                                 ffmpeg_params=ffmpeg_params, **animation)
+
+    # built once here, so the workers only map it
+    BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps)
+    segment_dir = tempfile.mkdtemp(prefix="segments_")
+    try:
+        jobs = [{
+            "card_img": card_img,
+            "duration": duration,
+            "fps": fps,
+            "start": start,
+            "end": end,
+            "path": os.path.join(segment_dir, f"{index:04d}.mp4"),
+            "codec": codec,
+            "ffmpeg_params": ffmpeg_params,
+            "threads": max(1, cpus // len(ranges)),
+            "animation": animation,
+        } for index, (start, end) in enumerate(ranges)]
+
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            segments = list(executor.map(render_segment, jobs))
+
+        # summed over the segments, so with several segments it is more than the wall time
+        timings = FrameTimings()
+        for _, seconds in segments:
+            timings.add(seconds)
+        timings.record()
+
+        concat_segments([path for path, _ in segments], audio_path, video_path)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    return video_path
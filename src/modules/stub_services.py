@@ -0,0 +1,204 @@
+"""Local stand-ins for the external services, so batches can be run offline.
+
+    python stub_services.py 8765
+
+then point the OpenAI client at http://127.0.0.1:8765/v1 (e.g. OPENAI_BASE_URL), and
+card_source at http://127.0.0.1:8765/api/v7/cardinfo.php for a paginated card search.
+"""
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # seconds each request takes, to imitate API latency
+    latency = 0.0
+    # cards in the synthetic cardinfo.php result set
+    total_cards = 250
+    # fraction of requests answered with a transient error (alternating 429 and 503), to exercise retries
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_transient_error(self):
+        """Answers with a 429 or a 503 with probability error_rate, returns whether it did"""
+        if self.error_rate <= 0 or random.random() >= self.error_rate:
+            return False
+        if random.random() < 0.5:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.1')
+        else:
+            self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return True
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        if self.send_transient_error():
+            return
+        if self.path.endswith('/chat/completions'):
+            request = self.read_json()
+            self.send_json(chat_completion(request))
+        else:
+            self.send_json({"error": {"message": f"no stub for {self.path}"}}, status=404)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.send_transient_error():
+            return
+        url = urlparse(self.path)
+        if url.path.endswith('/cardinfo.php'):
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            status, data = card_page(self.total_cards, int(params.get("num", 0)), int(params.get("offset", 0)), url.path)
+            self.send_json(data, status=status)
+        else:
+            self.send_json({"error": f"no stub for {self.path}"}, status=404)
+
+
+def stub_card(index):
+    return {
+        "id": 10000000 + index,
+        "name": f"Stub Card {index}",
+        "type": "Spell Card",
+        "humanReadableCardType": "Normal Spell",
+        "desc": f"Stub card number {index}.",
+        "card_images": [{"image_url": f"stub://cards/{10000000 + index}.jpg"}],
+    }
+
+
+def card_page(total, num, offset, path):
+    """(status, body) for a cardinfo.php page, paged like the real API: "meta" only when
+    num is given, and a 400 past the last card"""
+    if not num:
+        return 200, {"data": [stub_card(i) for i in range(total)]}
+    if offset >= total:
+        return 400, {"error": "No card matching your query was found in the database."}
+
+    cards = [stub_card(i) for i in range(offset, min(offset + num, total))]
+    rows_remaining = max(0, total - offset - len(cards))
+    meta = {
+        "current_rows": len(cards),
+        "total_rows": total,
+        "rows_remaining": rows_remaining,
+        "total_pages": -(-total // num),
+        "pages_remaining": -(-rows_remaining // num),
+    }
+    if rows_remaining:
+        meta["next_page"] = f"{path}?num={num}&offset={offset + num}"
+        meta["next_page_offset"] = offset + num
+    return 200, {"data": cards, "meta": meta}
+
+
+def chat_completion(request):
+    """A canned completion that names the card from the prompt"""
+    prompt = request["messages"][-1]["content"]
+    name = "This card"
+    for line in prompt.splitlines():
+        if line.strip().startswith("Name:"):
+            name = line.split(":", 1)[1].strip()
+            break
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": f"{name} is a card that does something useful."},
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class StubServices:
+    """Offline drop-in for pipeline.ApiServices: synthetic card art, canned scripts and a
+    sine tone as narration, each after `latency` seconds to imitate the real services."""
+
+    def __init__(self, latency=0.0, words_per_second=2.5):
+        self.latency = latency
+        self.words_per_second = words_per_second
+
+    def fetch_image(self, card):
+        import numpy as np
+        from image_cache import cache_paths, CACHE_DIR
+
+        time.sleep(self.latency)
+        _, array_path = cache_paths(card["card_images"][0]["image_url"])
+        if not os.path.isfile(array_path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # card-shaped gradient, the size of a ygoprodeck card image
+            card_img = np.zeros((614, 421, 3), dtype=np.uint8)
+            card_img[:, :, 0] = np.linspace(0, 255, 614, dtype=np.uint8)[:, None]
+            card_img[:, :, 2] = 160
+            np.save(array_path, card_img)
+
+    def get_script(self, card):
+        time.sleep(self.latency)
+        return f"{card['name']} is a card that does something useful."
+
+    def synthesize(self, card, script):
+        from tts_cache import card_narration
+
+        time.sleep(self.latency)
+        return card_narration(StubElevenLabs(self.words_per_second), card["name"], script)
+
+
+class StubElevenLabs:
+    """Stands in for elevenlabs.client.ElevenLabs: narration is a sine tone as long as the
+    script would take to read."""
+
+    def __init__(self, words_per_second=2.5):
+        self.words_per_second = words_per_second
+        self.text_to_speech = self
+
+    def convert(self, text, **kwargs):
+        duration = max(1.0, len(text.split()) / self.words_per_second)
+        command = [
+            'ffmpeg', '-v', 'error',
+            '-f', 'lavfi', '-i', f'sine=frequency=220:duration={duration}',
+            '-b:a', '128k',
+            '-f', 'mp3', '-'
+        ]
+        result = subprocess.run(command, check=True, capture_output=True)
+        return iter([result.stdout])
+
+
+def serve(port=0, handler=StubHandler, error_rate=None):
+    """Starts the stub server on a background thread and returns (server, base_url).
+    error_rate makes that fraction of requests fail with a 429 or 503."""
+    if error_rate is not None:
+        handler = type("FlakyStubHandler", (handler,), {"error_rate": error_rate})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import sys
+
+    server, base_url = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"✅ Stub services running at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
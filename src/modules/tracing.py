@@ -0,0 +1,189 @@
+import json
+import math
+import os
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+# set by configure() so worker processes, including spawned ones on Windows, trace to the same file
+TRACE_ENV = "YGO_TRACE"
+
+# the innermost open span of each thread, so code deep in a stage (e.g. HTTP retries) can annotate it
+_local = threading.local()
+
+
+class Span:
+    """One timed stage for one card. Attributes such as bytes_written or retries can be
+    set on it while it is open."""
+
+    def __init__(self, tracer, stage, card, attrs):
+        self.tracer = tracer
+        self.record = {"stage": stage, "card": card, "worker": os.getpid(), "retries": 0, **attrs}
+
+    def set(self, **attrs):
+        self.record.update(attrs)
+
+    def add(self, name, amount=1):
+        self.record[name] = self.record.get(name, 0) + amount
+
+    def __enter__(self):
+        self.record["start"] = time.time()
+        self._start = time.perf_counter()
+        self._parent = getattr(_local, "span", None)
+        _local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.span = self._parent
+        self.record["seconds"] = round(time.perf_counter() - self._start, 4)
+        if exc_type is None:
+            self.record["status"] = "ok"
+        else:
+            self.record["status"] = "error"
+            self.record["error"] = f"{exc_type.__name__}: {exc}"
+            self.record["traceback"] = "".join(traceback.format_exception(exc_type, exc, tb))
+        self.tracer.write(self.record)
+        return False
+
+
+class NullSpan:
+    """What a disabled tracer hands out: one shared object whose methods do nothing"""
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, name, amount=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Writes stage spans as JSON Lines. Every process appends whole lines to the same file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = path is not None
+
+    def span(self, stage, card=None, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage, card, attrs)
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        # one write per line in append mode, so lines from concurrent workers don't interleave
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+    def records(self, since=None):
+        if not self.enabled or not os.path.isfile(self.path):
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                record = json.loads(line)
+                if since is None or record["start"] >= since:
+                    records.append(record)
+        return records
+
+    def summary(self, since=None):
+        return summarize(self.records(since))
+
+    def print_summary(self, since=None):
+        if self.enabled:
+            print_summary(self.summary(since))
+
+
+_tracer = None
+
+
+def configure(path):
+    """Turns tracing on for this process and every worker it starts. path=None turns it off."""
+    global _tracer
+    if path is None:
+        os.environ.pop(TRACE_ENV, None)
+    else:
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.environ[TRACE_ENV] = path
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def get_tracer():
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(os.environ.get(TRACE_ENV))
+    return _tracer
+
+
+def span(stage, card=None, **attrs):
+    return get_tracer().span(stage, card, **attrs)
+
+
+def current_span():
+    """The span open on this thread, or NULL_SPAN"""
+    return getattr(_local, "span", None) or NULL_SPAN
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(records):
+    """Per-stage count, errors, p50/p95/total seconds, plus batch throughput"""
+    by_stage = defaultdict(list)
+    errors = defaultdict(int)
+    retries = defaultdict(int)
+    cards = set()
+    for record in records:
+        by_stage[record["stage"]].append(record["seconds"])
+        retries[record["stage"]] += record.get("retries", 0)
+        if record["status"] != "ok":
+            errors[record["stage"]] += 1
+        elif record["stage"] in ("render", "short") and record.get("card"):
+            cards.add(record["card"])
+
+    stages = {}
+    for stage, seconds in by_stage.items():
+        seconds.sort()
+        stages[stage] = {
+            "count": len(seconds),
+            "errors": errors[stage],
+            "retries": retries[stage],
+            "p50": percentile(seconds, 50),
+            "p95": percentile(seconds, 95),
+            "total": round(sum(seconds), 3),
+        }
+
+    wall = 0.0
+    if records:
+        wall = max(r["start"] + r["seconds"] for r in records) - min(r["start"] for r in records)
+
+    return {
+        "stages": stages,
+        "cards_completed": len(cards),
+        "wall_seconds": round(wall, 3),
+        "cards_per_min": round(len(cards) / wall * 60, 2) if wall > 0 else 0.0,
+    }
+
+
+def print_summary(summary):
+    print("\n📊 Stage timings:")
+    print(f"{'stage':<12}{'count':>7}{'errors':>8}{'retries':>9}{'p50 s':>9}{'p95 s':>9}{'total s':>10}")
+    for stage, row in summary["stages"].items():
+        print(f"{stage:<12}{row['count']:>7}{row['errors']:>8}{row['retries']:>9}{row['p50']:>9.2f}{row['p95']:>9.2f}{row['total']:>10.1f}")
+    print(f"Throughput: {summary['cards_per_min']} cards/min ({summary['cards_completed']} cards in {summary['wall_seconds']}s)")
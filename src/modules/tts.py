@@ -0,0 +1,54 @@
+import os
+import re
+
+AUDIO_DIR = os.path.join('src', 'audio')
+OUTPUT_FORMAT = "mp3_44100_128"
+
+VOICE_IDS = {
+    "PRESTIGED" : "ijEuPMqoI2gEEA41kGv3"
+}
+
+VOICE_MODELS = {
+    "flash" : "eleven_flash_v2_5",
+    "expensive" : "eleven_multilingual_v2"
+}
+
+VOICE_SETTINGS = {
+    "stability": 0.70,
+    "similarity_boost": 0.99,
+    "speed": 0.95
+}
+
+
+def audio_path_for(card_name, audio_dir=AUDIO_DIR):
+    audio_name = re.sub(r'[<>:"/\\|?*]', ' ', card_name)
+    return os.path.join(audio_dir, f"{audio_name}.mp3")
+
+
+def synthesize_speech(client, text, output_path, voice_id=VOICE_IDS["PRESTIGED"], model_id=VOICE_MODELS["flash"],
+                      voice_settings=VOICE_SETTINGS, output_format=OUTPUT_FORMAT):
+    """Synthesizes text with ElevenLabs, or a local engine such as chatts.ChatTTSEngine, and
+    writes the mp3 to output_path"""
+    if hasattr(client, "speech_stream"):
+        audio_stream = client.speech_stream(text, voice_id=voice_id, model_id=model_id,
+                                            voice_settings=voice_settings, output_format=output_format)
+    else:
+        from elevenlabs import VoiceSettings
+
+        audio_stream = client.text_to_speech.convert(
+            voice_id=voice_id,
+            output_format=output_format,
+            text=text,
+            model_id=model_id,
+            voice_settings=VoiceSettings(**voice_settings)
+        )
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in audio_stream:
+            f.write(chunk)
+    # a crashed synthesis never leaves a truncated mp3 that looks reusable
+    os.replace(tmp_path, output_path)
+
+    return output_path
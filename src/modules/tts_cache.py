@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from api_clients import call_with_retries, limiter_for
+from media_probe import probe_media
+from tts import OUTPUT_FORMAT, VOICE_IDS, VOICE_MODELS, VOICE_SETTINGS, audio_path_for, synthesize_speech
+
+CACHE_DIR = os.path.join('src', 'cache', 'tts')
+MAX_CACHE_BYTES = 1024 ** 3  # 1 GB of narration
+
+
+def tts_key(text, voice_id, model_id, voice_settings, output_format):
+    """Hash of every synthesis input, so a changed script, voice, model or setting is a miss"""
+    payload = json.dumps({
+        "text": text,
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "voice_settings": voice_settings,
+        "output_format": output_format,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """Content-addressed narration cache.
+
+    Each entry is <key>.mp3 plus a <key>.json metadata record (duration, sample rate,
+    size). Identical requests that are in flight at the same time, e.g. duplicate scripts
+    in a batch, share one synthesis.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".mp3", base + ".json"
+
+    def lookup(self, key):
+        audio_path, meta_path = self.paths(key)
+        if os.path.isfile(audio_path) and os.path.isfile(meta_path):
+            os.utime(audio_path)  # mark as recently used for eviction
+            return audio_path
+        return None
+
+    def get(self, client, text, voice_id=VOICE_IDS["PRESTIGED"], model_id=VOICE_MODELS["flash"],
+            voice_settings=VOICE_SETTINGS, output_format=OUTPUT_FORMAT):
+        """Returns the path of the narration for these inputs, synthesizing it only on a miss"""
+        key = tts_key(text, voice_id, model_id, voice_settings, output_format)
+
+        with self.lock:
+            audio_path = self.lookup(key)
+            if audio_path:
+                return audio_path
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            audio_path, meta_path = self.paths(key)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # a local engine has no quota to respect, only ElevenLabs goes through its rate limiter
+            limiter = None if hasattr(client, "speech_stream") else limiter_for("elevenlabs")
+            call_with_retries(synthesize_speech, client, text, audio_path, voice_id=voice_id, model_id=model_id,
+                              voice_settings=voice_settings, output_format=output_format, limiter=limiter)
+
+            info = probe_media(audio_path)
+            meta = {
+                "duration": info["duration"],
+                "sample_rate": info.get("sample_rate"),
+                "size": os.path.getsize(audio_path),
+                "voice_id": voice_id,
+                "model_id": model_id,
+                "chars": len(text),
+            }
+            tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(meta, file, indent=2)
+            os.replace(tmp_path, meta_path)
+
+            self.evict()
+            future.set_result(audio_path)
+            return audio_path
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def get_many(self, client, texts, max_in_flight=4, **synthesis):
+        """Synthesizes a batch of scripts, each distinct script once. Returns paths in order.
+
+        Up to max_in_flight misses are requested at the same time, so a batching engine
+        (chatts.ChatTTSEngine) synthesizes them in one call.
+        """
+        distinct = list(dict.fromkeys(texts))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(distinct)))) as executor:
+            paths = dict(zip(distinct, executor.map(lambda text: self.get(client, text, **synthesis), distinct)))
+        return [paths[text] for text in texts]
+
+    def index(self):
+        """Metadata of every cached entry, keyed by cache key"""
+        entries = {}
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.cache_dir, name), 'r') as file:
+                    entries[name[:-len(".json")]] = json.load(file)
+        return entries
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for key, meta in self.index().items():
+            audio_path, _ = self.paths(key)
+            if os.path.isfile(audio_path):
+                entries.append((os.path.getmtime(audio_path), key, meta["size"]))
+                total += meta["size"]
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+# one cache per process, shared by every card it renders
+tts_cache = TTSCache()
+
+
+def card_narration(client, card_name, script, **synthesis):
+    """Narration for a card's script via the cache, copied to src/audio/<card name>.mp3"""
+    cached_path = tts_cache.get(client, script, **synthesis)
+    output_path = audio_path_for(card_name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    shutil.copyfile(cached_path, output_path)
+    return output_path
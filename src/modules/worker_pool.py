@@ -0,0 +1,84 @@
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+# what a render worker needs, imported once per process before its first card
+RENDER_MODULES = ["numpy", "cv2", "raw_render", "dual_render", "audio_mix", "yugioh_video_maker"]
+SHORT_MODULES = ["encoders", "media_probe"]
+
+# this worker's import and warm-up timings, reported back by worker_warmup
+_warmup = {}
+
+
+def import_modules(modules):
+    """Imports modules and returns the seconds each one took (0 if it was already loaded)"""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timings
+
+
+def warm_render_worker(fps=30, with_short=False):
+    """Pool initializer for render workers: the heavy imports, the mapped background stores,
+    the encoder probe and the decoded music beds, all before the first card arrives."""
+    start = time.perf_counter()
+    try:
+        _warmup["imports"] = import_modules(RENDER_MODULES)
+
+        import audio_mix
+        import encoders
+        from background_store import BackgroundStore
+        from dual_render import SHORT_SIZE
+        from raw_render import LANDSCAPE_SIZE
+
+        BackgroundStore.open(size=LANDSCAPE_SIZE, fps=fps)
+        if with_short:
+            BackgroundStore.open(size=SHORT_SIZE, fps=fps)
+        encoders.probe()
+        audio_mix.preload()
+    except Exception as e:
+        # a failing initializer breaks the whole pool, the card that needs it will report the error instead
+        print(f"⚠️ Worker {os.getpid()} warm-up incomplete: {e}")
+    _warmup["seconds"] = round(time.perf_counter() - start, 4)
+
+
+def warm_short_worker():
+    """Pool initializer for Short conversion workers, which only run ffmpeg"""
+    start = time.perf_counter()
+    try:
+        _warmup["imports"] = import_modules(SHORT_MODULES)
+
+        import encoders
+
+        encoders.probe()
+    except Exception as e:
+        print(f"⚠️ Worker {os.getpid()} warm-up incomplete: {e}")
+    _warmup["seconds"] = round(time.perf_counter() - start, 4)
+
+
+def worker_warmup(hold=0.05):
+    # held briefly, so a worker that is already warm can't take every warm-up task for itself
+    time.sleep(hold)
+    return os.getpid(), dict(_warmup)
+
+
+def warm_pool(max_workers, initializer=warm_render_worker, initargs=(), max_rounds=20):
+    """A ProcessPoolExecutor whose workers are all started and warmed before it is returned,
+    so the first cards don't queue behind imports. Per-worker timings are in .warmup."""
+    executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs)
+    start = time.perf_counter()
+    executor.warmup = {}
+    # one task per worker makes the executor start all of them, but an idle worker may still
+    # run several, so keep asking until every worker has answered once
+    for _ in range(max_rounds):
+        futures = [executor.submit(worker_warmup) for _ in range(max_workers - len(executor.warmup))]
+        wait(futures)
+        executor.warmup.update(future.result() for future in futures)
+        if len(executor.warmup) >= max_workers:
+            break
+    executor.warm_seconds = round(time.perf_counter() - start, 3)
+    print(f"🔥 {len(executor.warmup)} of {max_workers} workers warm in {executor.warm_seconds}s")
+    return executor
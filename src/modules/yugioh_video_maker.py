@@ -1,23 +1,63 @@
-import requests
+import argparse
+import difflib
 import os
-from openai import OpenAI
-import json
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
-from elevenlabs import VoiceSettings
-from moviepy import *
 import random
-import numpy as np
-from PIL import Image
-from io import BytesIO
-import math
 import re
+import tempfile
+
+# no render engine at import time: cv2 and the frame store, the API SDKs and ChatTTS are
+# imported by the stage that uses them, so workers that only need part of the maker don't
+# pay for all of it (numpy still loads here, image_cache and audio_mix need it)
+from encoders import select_encoder
+from card_db import CardDB
+from image_cache import get_card_image
+from prompts import build_prompt
+from script_cache import get_script
+from script_template import template_script
+from tts import VOICE_IDS, VOICE_MODELS, audio_path_for
+from tts_cache import card_narration
+from audio_mix import mix_card_audio, music_path
+from tracing import span
+from api_clients import get_clients, http
+from prompting import InteractionRequired, ask, check_policy, confirm
+
+# every decision the maker can ask about is a policy; only "ask" ever reads from stdin
+REUSE_POLICIES = ("ask", "reuse", "regenerate")
+MATCH_POLICIES = ("ask", "accept", "reject")
+REVIEW_MODES = ("ask", "auto")
+
+
+class CardNotFound(LookupError):
+    pass
+
+
+def reuse_policy(reuse_audio):
+    # True/False/None from before the policies existed
+    legacy = {True: "reuse", False: "regenerate", None: "ask"}
+    if isinstance(reuse_audio, bool) or reuse_audio is None:
+        return legacy[reuse_audio]
+    return check_policy("audio reuse policy", reuse_audio, REUSE_POLICIES)
+
+
+def video_name(name):
+    # Replaces invalid characters with a space and removes any leading or trailing spaces
+    return re.sub(r'[<>:"/\\|?*]', ' ', name).strip()
+
+
+def match_ratio(card_name, match_name):
+    return difflib.SequenceMatcher(None, card_name.upper(), match_name.upper()).ratio()
 
-from functools import partial
-import cv2
 
 class YugiohVideoMaker:
-    def __init__(self, card_name=None, voice_id="PRESTIGED", bg_audio:int=None, card_effect=None, card_readable_type=None, card_img=None, card_type=None, card_atk = None, card_def = None) -> None:
+    def __init__(self, card_name=None, voice_id="PRESTIGED", bg_audio:int=None, card_effect=None, card_readable_type=None, card_img=None, card_type=None, card_atk = None, card_def = None, card_id=None, reuse_audio="reuse", match_policy="reject", min_match_ratio=0.0) -> None:
+        """reuse_audio decides what happens to narration made by an earlier run: "reuse" keeps
+        it (no new script is generated), "regenerate" replaces it, "ask" asks.
+
+        match_policy decides what happens when card_name has no exact match: "accept" takes the
+        closest card if its name is at least min_match_ratio similar, "reject" raises
+        CardNotFound, "ask" asks. The defaults never read from stdin, so the maker is safe in
+        worker processes; "ask" without a terminal raises InteractionRequired.
+        """
         self.card_name = card_name
         self.card_effect = card_effect
         self.card_readable_type = card_readable_type
@@ -25,51 +65,54 @@ class YugiohVideoMaker:
         self.card_type = card_type
         self.card_atk = card_atk
         self.card_def = card_def
+        self.card_id = card_id
 
         self.script = None
         self.audio = None
         self.bg_audio = bg_audio
 
-        self.voice_ids = {
-            "PRESTIGED" : "ijEuPMqoI2gEEA41kGv3"
-        }
+        self.voice_ids = VOICE_IDS
 
         if voice_id not in self.voice_ids:
             self.voice_id = self.voice_ids["PRESTIGED"]
         else:
             self.voice_id = self.voice_ids[voice_id]
 
-        self.voice_models = {
-            "flash" : "eleven_flash_v2_5",
-            "expensive" : "eleven_multilingual_v2"
-        }
+        self.voice_models = VOICE_MODELS
+
+        self.match_policy = check_policy("match policy", match_policy, MATCH_POLICIES)
+        self.min_match_ratio = min_match_ratio
 
-        # open our secrets json and load OpenAI api key
-        with open('src\modules\secrets.json', 'r') as file:
-            self.secrets = json.load(file)
+        self.load_card_details(card_name, reuse_audio) # we need to load card details before setting the prompt
 
-        self.client = OpenAI(
-            api_key = self.secrets["openai_api_key"]
-        )
+    # created once per process and shared by every card it makes (see api_clients), on first use,
+    # so a render worker whose script and audio are already done never loads the SDKs
+    @property
+    def secrets(self):
+        return get_clients().secrets
 
-        self.elevenlabs_client = ElevenLabs(
-            api_key = self.secrets["elevenlabs_api_key"],
-        )
+    @property
+    def client(self):
+        return get_clients().openai
 
-        self.load_card_details(card_name) # we need to load card details before setting the prompt
+    @property
+    def elevenlabs_client(self):
+        return get_clients().elevenlabs
 
-    def load_card_details(self, card_name=None):
-        existing_audio = os.path.join('src', 'audio', f"{self.card_name}.mp3") if self.card_name else None
+    def load_card_details(self, card_name=None, reuse_audio="reuse"):
+        reuse_audio = reuse_policy(reuse_audio)
+        existing_audio = audio_path_for(self.card_name) if self.card_name else None
         
         if existing_audio and os.path.isfile(existing_audio):
             print(f"🟡 {self.card_name} audio already exists.")
-            cont = input("❓ Would you like to reuse that audio? (y/n) ")
+            if reuse_audio == "ask":
+                reuse = confirm("❓ Would you like to reuse that audio?")
+            else:
+                reuse = reuse_audio == "reuse"
 
-            if cont == "y":
-                print("✅ Continuing with existing data")
-                card_img = Image.open(BytesIO(requests.get(self.card_img).content))
-                self.card_img = np.array(card_img)
-                return
+            if reuse:
+                print("✅ Continuing with existing audio")
+                self.audio = existing_audio
 
         # Load card details if they haven't already been set
         if not all([self.card_name, self.card_img, self.card_type, self.card_readable_type, self.card_effect]):
@@ -78,94 +121,76 @@ class YugiohVideoMaker:
             self.card_readable_type = card["humanReadableCardType"]
             self.card_effect = card["desc"]
             self.card_type = card["type"]
+            self.card_id = card.get("id")
+            self.card_atk = card.get("atk")
+            self.card_def = card.get("def")
             self.card_img = card["card_images"][0]["image_url"]
             
-        card_img = Image.open(BytesIO(requests.get(self.card_img).content))
-        self.card_img = np.array(card_img)
+        self.card_img = get_card_image(self.card_img)
 
         print(f"✅ Loaded card: {self.card_name}")
 
 
 
     def get_prompt(self, context=None, adjustments=None):
-        return f"""
-        Write an engaging YouTube Short script about this Yu-Gi-Oh! card, explaining what it does. I may provide you with optional context that you should use to make the script more engaging. IF I don't provide any context, just follow the base script.
-
-        ### Base Script (Mandatory Formatting):
-        Follow this structure when generating the script:
-
-        - If the {self.card_readable_type} is a **Normal Monster**, follow this format:
-        "[Name] is a [Card Type] whose flavor text reads, {{read the [Effect] word for word}}."
-
-        - Otherwise, use this structure without extra commentary—stick to describing the card:
-        "[Name] is a [Card Type] that {{summarize the [Effect]}}."
-
-        ### Rules:
-        1. Keep the tone semi-neutral and engaging—**avoid being corny**.
-        2. Use **simple, easy-to-understand vocabulary** (e.g., "strong" instead of "formidable").
-        3. **Spell out numbers fully** (e.g., "four" instead of "4").
-        4. Replace:
-        - **ATK → attack**
-        - **DEF → defense**
-        5. **Pronunciation Rules (FOLLOW THESE STRICTLY):**
-        - If the [Effect] and/or [Card Type] contains **"Xyz"**, rewrite it as **"ekseez."**
-        - If **"XYZ"** appears in the card [Name], **leave it unchanged**.
-        - **If the card [Name] starts with "CXyz", rewrite it as "see ekseez"—NEVER say "CXyz".**
-        6. Never refer to a **Monster** card as a "creature"—**always use "monster."**
-        7. If the [Card Type] is a Fusion, Synchro, Xyz, Ritual, Pendulum, or Link monster and the only text in the [Effect] is summoning requirements, mention only its **attack** and **defense.**
-        8. If the [Card Type] is a Spell/Trap, **do not mention attack or defense.**
-
-        9. **Name Formatting Rules (FOLLOW THESE STRICTLY):**
-        - **Remove all special characters** from the [Name] in spoken output.
-            - Example: "Danger!? Tsuchinoko?" → "Danger Tsuchinoko."
-        - **Replace "&" with "and."**
-            - Example: "Ash & Leo" → "Ash and Leo."
-        - **If the card [Name] contains "LV", rewrite it as "level."**
-            - Example: "Armed Dragon LV10" → "Armed Dragon Level Ten."
-
-        10. **Do not ignore or alter these rules. These are mandatory replacements.**
-        11. **If I provide you with adjustments, that means you have already written a script and it was bad. Keep those adjustments in mind when writing the next script.**
-
-        ---
-        ### Card Details:
-        Name: {self.card_name}
-        Effect: {self.card_effect}
-        Card Type: {self.card_readable_type}
-
-        ### Optional Context:
-        {context}
-
-        ### Adjustments:
-        {adjustments}
-        """
+        return build_prompt(self.card_name, self.card_effect, self.card_readable_type, context, adjustments)
 
     def get_card(self, card_name=None):
+        # use the local card database when it has been built, it needs no network round-trip
+        if CardDB.available():
+            return self.get_local_card(card_name)
 
         if card_name == None:
             url = "https://db.ygoprodeck.com/api/v7/randomcard.php"
-            response = requests.get(url).json()
+            response = http().get(url).json()
             return response["data"][0]
         else:
-            url = f"https://db.ygoprodeck.com/api/v7/cardinfo.php?fname={card_name}"
-            response = requests.get(url).json()
+            url = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
+            response = http().get(url, params={"fname": card_name}).json()
 
-            if len(response["data"]) < 1:
-                print(f"❌ No results matching {card_name}")
-                return -1
+            if "data" not in response or len(response["data"]) < 1:
+                raise CardNotFound(f"No results matching {card_name}")
 
-            for i in range(len(response)):
-                if response["data"][i]["name"].upper() == card_name.upper():
-                    return response["data"][i]
+            for card in response["data"]:
+                if card["name"].upper() == card_name.upper():
+                    return card
             
-            print(f"🟡 No results matching {card_name}. The first result is {response['data'][0]['name']}")
-
-            cont = input(f"Would you like to continue with {response['data'][0]['name']}? (y/n) ")
-
-            if cont == "y":
-                return response["data"][0]
-            else:
-                exit()
+            return self.confirm_closest_card(card_name, response["data"][0])
+
+    def get_local_card(self, card_name=None):
+        db = CardDB()
+        try:
+            if card_name == None:
+                return db.random()
+
+            card = db.exact(card_name)
+            if card:
+                return card
+
+            matches = db.search(card_name, limit=1) or db.fuzzy(card_name, limit=1)
+            if not matches:
+                raise CardNotFound(f"No results matching {card_name}")
+
+            return self.confirm_closest_card(card_name, matches[0])
+        finally:
+            db.close()
+
+    def confirm_closest_card(self, card_name, closest):
+        print(f"🟡 No results matching {card_name}. The first result is {closest['name']}")
+
+        if self.match_policy == "ask":
+            accepted = confirm(f"Would you like to continue with {closest['name']}?")
+        elif self.match_policy == "accept":
+            ratio = match_ratio(card_name, closest["name"])
+            accepted = ratio >= self.min_match_ratio
+            if not accepted:
+                print(f"❌ {closest['name']} is only {ratio:.0%} similar to {card_name}")
+        else:
+            accepted = False
 
+        if accepted:
+            return closest
+        raise CardNotFound(f"No card named {card_name}, closest was {closest['name']}")
 
     def get_script_from_chatgpt(self, prompt=None, gpt_model="gpt-4o-mini"): 
         if prompt == None:
@@ -175,46 +200,39 @@ class YugiohVideoMaker:
         if self.card_name == None or self.card_effect == None or self.card_readable_type == None or prompt == None: 
             raise Exception("Error, make sure card data is retrieved before function call")
         
-        chat_completion = self.client.chat.completions.create(
-            messages=[
-                {
-                    "role" : "user",
-                    "content" : prompt
-                }
-            ], model=gpt_model,
-        )
-        script = chat_completion.choices[0].message.content
+        # scripts are cached by (prompt, model, card), so a re-run batch doesn't pay for them again
+        script = get_script(self.client, prompt, self.card_id or self.card_name, model=gpt_model)
         print("✅ Script received from ChatGPT")
         return script
     
+    def get_card_script(self, context=None, adjustments=None, gpt_model="gpt-4o-mini"):
+        """The card's script, built locally from its template when the card needs no summary
+        (see script_template) and there is no context or adjustments to work in"""
+        if context is None and adjustments is None:
+            script = template_script(self.card_name, self.card_effect, self.card_readable_type, self.card_atk,
+                                     self.card_def)
+            if script is not None:
+                print(f"✅ Script for {self.card_name} built from its template")
+                return script
+        return self.get_script_from_chatgpt(self.get_prompt(context=context, adjustments=adjustments), gpt_model)
+
     def set_script(self, script=None):
         self.script = script
     
-    def get_audio(self):
+    def get_audio(self, tts_backend="elevenlabs"):
+        """Narrates the script with ElevenLabs, or with the local ChatTTS engine (tts_backend="chattts")"""
         if not self.script:
             raise Exception("Error, make sure script is set before function call")
-        
-        audio_stream = self.elevenlabs_client.text_to_speech.convert(
-        voice_id=self.voice_ids["PRESTIGED"],
-        output_format="mp3_44100_128",
-        text=self.script,
-        model_id=self.voice_models["flash"],
-        voice_settings=VoiceSettings(
-            stability=0.70,
-            similarity_boost=0.99,
-            speed=0.95
-        )
-    )
-        
-        if not os.path.exists('assets'):
-            os.makedirs('assets')
-        
-        audio_name = re.sub(r'[<>:"/\\|?*]', ' ', self.card_name)
-        output_path = os.path.join('src', 'audio', f"{audio_name}.mp3")
 
-        with open(output_path, "wb") as f:
-            for chunk in audio_stream:
-                f.write(chunk)
+        # cached by script, voice, model and settings, so only a changed input is synthesized again
+        if tts_backend == "chattts":
+            from chatts import get_engine
+
+            engine = get_engine()
+            output_path = card_narration(engine, self.card_name, self.script, **engine.synthesis)
+        else:
+            output_path = card_narration(self.elevenlabs_client, self.card_name, self.script,
+                                         voice_id=self.voice_id, model_id=self.voice_models["flash"])
 
         print(f"✅ Audio saved as {output_path}")
         self.audio = output_path
@@ -222,153 +240,156 @@ class YugiohVideoMaker:
 
     def create_video(self, rotation_start=90, flip_axis='x',  
     rotation_end=0, flip_duration_ratio=0.03, start_scale=0.4,            # card starts at 30% of full size
-    end_scale=0.7
+    end_scale=0.7, with_short=False, short_dir=os.path.join('src', 'shorts'),
+    encoder_profile="balanced", duck_gain=None, tts_backend="elevenlabs", segments=None, narration_path=None
     ):
-        audio_name = re.sub(r'[<>:"/\\|?*]', ' ', self.card_name)
-        existing_audio = os.path.join('src', 'audio', f"{audio_name}.mp3")
-        if not os.path.isfile(existing_audio):
-            # If the file doesn't exist, generate it.
-            script_audio = self.get_audio()
+        """Renders the card video and returns its path.
+
+        With with_short, the 9:16 Short is rendered in the same pass into short_dir and
+        (video_path, short_path) is returned instead. encoder_profile is one of encoders.PROFILES.
+        duck_gain (e.g. 0.4) lowers the music further while the narrator is speaking.
+        tts_backend="chattts" narrates locally instead of with ElevenLabs.
+        segments splits the landscape render into that many parts rendered in parallel
+        processes, for a single card where one frame loop would leave cores idle.
+        narration_path is narration the caller already made for this card (the pipeline's I/O
+        stage), used as is: no TTS client is created. Otherwise the script, if set, is narrated.
+        """
+        existing_audio = audio_path_for(self.card_name)
+        if narration_path:
+            script_audio = narration_path
+        elif self.script or not os.path.isfile(existing_audio):
+            # Narrate the current script (a cache hit unless the script or voice changed).
+            with span("tts", self.card_name) as tts_span:
+                script_audio = self.get_audio(tts_backend)
+                tts_span.set(bytes_written=os.path.getsize(script_audio))
         else:
-            # Use the existing audio file.
+            # No script, reuse the audio that was made earlier.
             script_audio = existing_audio
 
-        # Now create an AudioFileClip from the determined path.
-        script_audio = AudioFileClip(script_audio)
-        video_duration = script_audio.duration
-
-        # get background video
-        bg_video = VideoFileClip(os.path.join('src', 'assets', 'background.mp4')).with_duration(video_duration)
-
         # get background audio
         if self.bg_audio == None:
             choice = random.randint(1, 5)
-            bg_audio_path = os.path.join('src', 'assets', 'music', f"{choice}.mp3")
             print(f"🟡 No background audio selected, using {choice}")
         else:
-            bg_audio_path = os.path.join('src', 'assets', 'music', f"{self.bg_audio}.mp3")
-
-        bg_audio = AudioFileClip(bg_audio_path).with_effects([afx.MultiplyVolume(0.1)])
-        bg_audio = bg_audio.with_duration(video_duration)
-
-        sfx = AudioFileClip(os.path.join('src', 'assets', 'sfx', 'sfx.mp3')).with_effects([afx.MultiplyVolume(0.7)])
-
-        full_audio = CompositeAudioClip([script_audio, bg_audio, sfx])
-        
-        T = video_duration
-        T_flip = T * flip_duration_ratio  # duration over which the flip happens
-
-        def flip_and_grow(get_frame, t):
-            frame = get_frame(t).copy()
-            if t <= T_flip:
-                # Flip phase: apply a flip transformation only.
-                fraction = t / T_flip  # goes from 0 to 1 during the flip phase
-                angle = rotation_start + fraction * (rotation_end - rotation_start)
-                if flip_axis == 'y':
-                    rad = math.radians(angle)
-                    # Simulate a flip about the y-axis by scaling the width by |cos(angle)|
-                    flip_scale_x = abs(math.cos(rad))
-                    flip_scale_y = 1.0
-                elif flip_axis == 'x':
-                    rad = math.radians(angle)
-                    # Flip about the x-axis by scaling the height by |cos(angle)|
-                    flip_scale_y = abs(math.cos(rad))
-                    flip_scale_x = 1.0
-                elif flip_axis == 'z':
-                    # For a 2D in-plane rotation, we will perform a full rotation transformation.
-                    flip_scale_x = 1.0
-                    flip_scale_y = 1.0
-                else:
-                    # Default to y-axis
-                    rad = math.radians(angle)
-                    flip_scale_x = abs(math.cos(rad))
-                    flip_scale_y = 1.0
-
-                # During the flip phase, we keep the zoom factor fixed at start_scale.
-                current_scale = start_scale
-                new_width = max(int(frame.shape[1] * flip_scale_x * current_scale), 1)
-                new_height = max(int(frame.shape[0] * flip_scale_y * current_scale), 1)
-                resized_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
-
-                if flip_axis == 'z':
-                    # For z-axis, apply an in-plane rotation
-                    center = (new_width // 2, new_height // 2)
-                    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                    rotated_frame = cv2.warpAffine(resized_frame, M, (new_width, new_height))
-                    return rotated_frame
+            choice = self.bg_audio
+
+        # mix narration, music and sfx once up front from cached PCM instead of per chunk during the encode
+        from dual_render import render_dual
+        from raw_render import render_card_video
+        from segment_render import render_card_video_segmented
+
+        mix_fd, mix_path = tempfile.mkstemp(suffix=".wav")
+        os.close(mix_fd)
+        with span("audio_mix", self.card_name) as mix_span:
+            video_duration = mix_card_audio(script_audio, music_path(choice), mix_path, duck_gain=duck_gain)
+            mix_span.set(duration=round(video_duration, 3))
+
+        try:
+            file_name = video_name(self.card_name)
+            video_path = f"./src/videos/{file_name}.mp4"
+
+            # fastest working H.264 encoder on this machine (NVENC when there is a GPU, libx264 otherwise)
+            codec, ffmpeg_params = select_encoder(encoder_profile)
+
+            animation = dict(rotation_start=rotation_start, flip_axis=flip_axis, rotation_end=rotation_end,
+                             flip_duration_ratio=flip_duration_ratio, start_scale=start_scale, end_scale=end_scale)
+
+            if with_short:
+                os.makedirs(short_dir, exist_ok=True)
+                short_path = os.path.join(short_dir, f"{file_name}_short.mp4")
+                with span("render", self.card_name, codec=codec, short=True) as render_span:
+                    render_dual(self.card_img, mix_path, video_duration, video_path, short_path, codec=codec,
+                                ffmpeg_params=ffmpeg_params, threads=4, **animation)
+                    render_span.set(bytes_written=os.path.getsize(video_path) + os.path.getsize(short_path))
+                print(f"✅ Video and short created for {self.card_name}")
+                return video_path, short_path
+
+            # the background comes from the shared frame store (decoded once, looped to the narration
+            # length) and frames are composited in place and piped straight into ffmpeg
+            with span("render", self.card_name, codec=codec, segments=segments or 1) as render_span:
+                if segments and segments > 1:
+                    render_card_video_segmented(self.card_img, mix_path, video_duration, video_path, codec=codec,
+                                                ffmpeg_params=ffmpeg_params, segments=segments, **animation)
                 else:
-                    return resized_frame
+                    render_card_video(self.card_img, mix_path, video_duration, video_path, codec=codec,
+                                      ffmpeg_params=ffmpeg_params, threads=4, **animation)
+                render_span.set(bytes_written=os.path.getsize(video_path))
+
+            print(f"✅ Video created for {self.card_name}")
+            return video_path
+        finally:
+            os.remove(mix_path)
+
+    def setup_video(self, script=None, context=None, script_review="auto", segments=None, **video_settings):
+        """Sets the script and renders the video, returning what create_video returns.
+
+        script is used as given. Otherwise, unless existing audio is being reused, one is
+        generated from the prompt (with context, if any) and script_review decides who approves
+        it: "auto" takes it as is, "ask" prints it and asks for adjustments until it is good,
+        and first offers to type in a script or context. video_settings go to create_video.
+        """
+        check_policy("script review mode", script_review, REVIEW_MODES)
 
-            else:
-                # Zoom phase: the flip is complete (the card remains at its final orientation).
-                # Apply a zoom that linearly scales the image from start_scale to end_scale over the time from T_flip to T.
-                fraction_zoom = (t - T_flip) / (T - T_flip) if (T - T_flip) > 0 else 1.0
-                zoom_factor = start_scale + fraction_zoom * (end_scale - start_scale)
-                new_width = max(int(frame.shape[1] * zoom_factor), 1)
-                new_height = max(int(frame.shape[0] * zoom_factor), 1)
-                return cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
-
-        # Pre-fill `duration` using functools.partial
-        # grow_with_duration = partial(grow, duration=video_duration)
-        grow_with_duration = partial(flip_and_grow)
-
-
-        card_clip = ImageClip(self.card_img).with_position('center').with_duration(video_duration).transform(grow_with_duration)
-
-        comp = CompositeVideoClip([bg_video, card_clip], size=(1920, 1080)
-                                  ).with_audio(full_audio)
-
-        # comp.preview(fps=30, audio=True, audio_fps=22050, audio_buffersize=3000, audio_nbytes=2)
-        video_name = re.sub(r'[<>:"/\\|?*]', ' ', self.card_name)  # Replaces invalid characters with a space
-        video_name = video_name.strip()  # Removes any leading or trailing spaces
-
-        comp.write_videofile(f"./src/videos/{video_name}.mp4", codec="libx264",  # H.264 codec
-            audio_codec="aac",  # Audio codec
-            threads=4,  # Set number of threads (optional)
-            ffmpeg_params=[
-                "-c:v", "h264_nvenc",  
-                "-preset", "p4",  
-                "-gpu", "0",  
-                "-b:a", "192k"  # Explicitly set audio bitrate
-            ]  # Use NVENC for H.264 encoding)
-        )
-
-        print(f"✅ Video created for {self.card_name}")
-
-    def setup_video(self, manual_script="n", context="n", skip_script_check=True):
-        if manual_script != "n":
-            manual_script = input("Would you like to provide a manual script? (y/n) ")
-            if manual_script == "y":
-                script = input("Enter script: ")
-                self.set_script(script)
+        if script is not None:
+            self.set_script(script)
+        elif self.audio:
+            print(f"⏭️ Reusing the existing narration of {self.card_name}")
         else:
-            if context != "n":
-                add_context = input("Would you like to provide context? (y/n) ")
-                if add_context == "y":
-                    context = input("Enter context: ")
-                prompt = self.get_prompt(context=context)
-            else:
-                prompt = self.get_prompt()
-
-            # script quality check
-            if not skip_script_check:
-                quality = False
-                script = self.get_script_from_chatgpt(prompt)
-
-                while not quality:
-                    print(script)
-                    good_script = input("Is this script good? (y/n) ")
-                    if good_script == "y":
-                        self.set_script(script)
-                        quality = True
-                    else:
-                        adjustments = input("Enter adjustments: ")
-                        prompt = self.get_prompt(context=context, adjustments=adjustments)
-                        script = self.get_script_from_chatgpt(prompt)
-        
-        self.create_video()
+            if script_review == "ask":
+                if confirm("Would you like to provide a manual script?"):
+                    self.set_script(ask("Enter script: "))
+                elif context is None and confirm("Would you like to provide context?"):
+                    context = ask("Enter context: ")
+
+            if not self.script:
+                self.set_script(self.review_script(context, script_review))
+
+        return self.create_video(segments=segments, **video_settings)
+
+    def review_script(self, context=None, script_review="auto"):
+        script = self.get_card_script(context)
+
+        # script quality check
+        while script_review == "ask":
+            print(script)
+            if confirm("Is this script good?"):
+                break
+            adjustments = ask("Enter adjustments: ")
+            script = self.get_card_script(context, adjustments)
+        return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the video of one Yu-Gi-Oh card")
+    parser.add_argument("card", nargs="?", help="card name (asked for with --interactive, a random card otherwise)")
+    parser.add_argument("--interactive", action="store_true", help="ask about every decision not given below")
+    parser.add_argument("--reuse-audio", choices=REUSE_POLICIES, help="existing narration (default: reuse)")
+    parser.add_argument("--match", choices=MATCH_POLICIES, help="closest card when there is no exact match (default: reject)")
+    parser.add_argument("--min-match-ratio", type=float, default=0.0, help="name similarity --match accept needs, 0 to 1")
+    parser.add_argument("--script-review", choices=REVIEW_MODES, help="who approves the generated script (default: auto)")
+    parser.add_argument("--script", help="use this script instead of generating one")
+    parser.add_argument("--context", help="extra context for the generated script")
+    parser.add_argument("--segments", type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                        help="parallel render segments (at most encoders.HARDWARE_SESSIONS with a GPU encoder)")
+    parser.add_argument("--with-short", action="store_true", help="render the Short in the same pass")
+    parser.add_argument("--tts-backend", choices=("elevenlabs", "chattts"), default="elevenlabs")
+    args = parser.parse_args()
+
+    def policy(value, headless):
+        return value or ("ask" if args.interactive else headless)
+
+    name = args.card
+    if name is None and args.interactive:
+        name = ask("Enter yugioh card name: ") or None
+
+    try:
+        v = YugiohVideoMaker(name, reuse_audio=policy(args.reuse_audio, "reuse"), match_policy=policy(args.match, "reject"),
+                             min_match_ratio=args.min_match_ratio)
+        # one card at a time, so spread its frames over every core
+        v.setup_video(script=args.script, context=args.context, script_review=policy(args.script_review, "auto"),
+                      segments=args.segments, with_short=args.with_short, tts_backend=args.tts_backend)
+    except (CardNotFound, InteractionRequired) as e:
+        parser.exit(1, f"❌ {e}\n")
 
 if __name__ == "__main__":
-    name = input("Enter yugioh card name: ")
-    v = YugiohVideoMaker(name)
-    v.setup_video(manual_script="y", context="y", skip_script_check=False)
\ No newline at end of file
+    main()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from card_db import CardDB, UnsupportedQuery, build_card_db, translate_query
+
+CARDS = [
+    {"id": 1, "name": "Dark Magician", "type": "Normal Monster", "frameType": "normal", "race": "Spellcaster",
+     "attribute": "DARK", "level": 7, "atk": 2500, "def": 2100, "desc": "The ultimate wizard.",
+     "card_sets": [{"set_name": "Legend of Blue Eyes White Dragon", "set_code": "LOB-005"}]},
+    {"id": 2, "name": "Summoned Skull", "type": "Normal Monster", "frameType": "normal", "race": "Fiend",
+     "attribute": "DARK", "level": 6, "atk": 2500, "def": 1200, "desc": "A fiend with dark powers.",
+     "card_sets": [{"set_name": "Metal Raiders", "set_code": "MRD-003"}]},
+    {"id": 3, "name": "Jinzo", "type": "Effect Monster", "frameType": "effect", "race": "Machine",
+     "attribute": "DARK", "level": 6, "atk": 2400, "def": 1500, "desc": "Trap Cards cannot be activated.",
+     "card_sets": [{"set_name": "Pharaoh's Servant", "set_code": "PSV-000"}],
+     "banlist_info": {"ban_goat": "Limited"}},
+    {"id": 4, "name": "Sangan", "type": "Effect Monster", "frameType": "effect", "race": "Fiend",
+     "attribute": "DARK", "level": 3, "atk": 1000, "def": 600, "desc": "Add 1 monster.",
+     "card_sets": [{"set_name": "Metal Raiders", "set_code": "MRD-069"}],
+     "banlist_info": {"ban_tcg": "Limited", "ban_ocg": "Limited"}},
+    {"id": 5, "name": "Decode Talker", "type": "Link Monster", "frameType": "link", "race": "Cyberse",
+     "attribute": "DARK", "atk": 2300, "linkval": 3, "linkmarkers": ["Top", "Bottom-Left", "Bottom-Right"],
+     "desc": "2+ Effect Monsters"},
+    {"id": 6, "name": "Link Spider", "type": "Link Monster", "frameType": "link", "race": "Cyberse",
+     "attribute": "EARTH", "atk": 1000, "linkval": 1, "linkmarkers": ["Bottom"], "desc": "1 Normal Monster"},
+    {"id": 7, "name": "Timegazer Magician", "type": "Pendulum Effect Monster", "frameType": "effect_pendulum",
+     "race": "Spellcaster", "attribute": "DARK", "level": 6, "scale": 8, "atk": 2000, "def": 2500,
+     "desc": "Pendulum Effect"},
+    {"id": 8, "name": "Shaddoll Construct", "type": "Fusion Monster", "frameType": "fusion", "race": "Spellcaster",
+     "attribute": "LIGHT", "level": 8, "atk": -1, "def": 2500, "desc": "1 Shaddoll monster"},
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    snapshot = tmp_path / "cardinfo.json"
+    snapshot.write_text(json.dumps({"data": CARDS}), encoding='utf-8')
+    db_path = str(tmp_path / "cards.sqlite")
+    build_card_db(str(snapshot), db_path=db_path)
+    db = CardDB(db_path)
+    yield db
+    db.close()
+
+
+def names(db, query):
+    return [card["name"] for card in db.query(query)]
+
+
+def test_text_and_number_filters(db):
+    assert names(db, "type=Effect Monster") == ["Jinzo", "Sangan"]
+    assert names(db, "race=fiend,machine&atk=gte2400") == ["Jinzo", "Summoned Skull"]
+    assert names(db, "level=lt6&attribute=DARK") == ["Sangan"]
+
+
+def test_unknown_stat(db):
+    assert names(db, "atk=?") == ["Shaddoll Construct"]
+
+
+def test_cardset_and_banlist(db):
+    assert names(db, "cardset=metal raiders") == ["Sangan", "Summoned Skull"]
+    assert names(db, "banlist=tcg&cardset=Metal Raiders&type=Effect Monster") == ["Sangan"]
+    assert names(db, "banlist=goat") == ["Jinzo"]
+
+
+def test_link_and_pendulum_filters(db):
+    assert names(db, "linkmarker=top&link=3") == ["Decode Talker"]
+    assert names(db, "linkmarker=bottom-left") == ["Decode Talker"]
+    assert names(db, "link=lte2") == ["Link Spider"]
+    assert names(db, "scale=8") == ["Timegazer Magician"]
+
+
+def test_sort_and_paging(db):
+    assert names(db, "race=Spellcaster&sort=atk") == ["Dark Magician", "Timegazer Magician", "Shaddoll Construct"]
+    assert names(db, "attribute=DARK&num=2&offset=2") == ["Jinzo", "Sangan"]
+
+
+@pytest.mark.parametrize("query", ["format=goat", "staple=yes", "misc=yes", "linkmarker=top,bottom", "banlist=rush",
+                                   "sort=views", "atk=many", "num=all"])
+def test_unsupported_queries_raise(query):
+    with pytest.raises(UnsupportedQuery):
+        translate_query(query)
+    assert not CardDB.supports(query)
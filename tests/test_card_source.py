@@ -0,0 +1,87 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from card_db import build_card_db
+from card_source import iter_card_pages, iter_cards
+from stub_services import StubHandler, serve
+
+
+def make_card(card_id):
+    return {
+        "id": card_id,
+        "name": f"Test Dragon {card_id:03d}",
+        "type": "Normal Monster",
+        "frameType": "normal",
+        "race": "Dragon",
+        "attribute": "LIGHT",
+        "level": 4,
+        "atk": 1000 + card_id,
+        "def": 1000,
+        "desc": "A test dragon.",
+        "humanReadableCardType": "Normal Monster",
+        "card_images": [{"image_url": f"http://example.invalid/{card_id}.jpg"}],
+    }
+
+
+def build_local_db(tmp_path, monkeypatch, count=25):
+    snapshot = tmp_path / "cardinfo.json"
+    snapshot.write_text(json.dumps({"data": [make_card(i) for i in range(1, count + 1)]}), encoding='utf-8')
+    # the card store lives at src/cache/cards.sqlite relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    build_card_db(str(snapshot))
+
+
+def test_pages_local_db(tmp_path, monkeypatch):
+    build_local_db(tmp_path, monkeypatch)
+
+    pages = list(iter_card_pages("race=Dragon", page_size=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert len({card["id"] for page in pages for card in page}) == 25
+
+
+def test_pages_local_db_on_different_threads(tmp_path, monkeypatch):
+    build_local_db(tmp_path, monkeypatch)
+
+    # like run_pipeline_async's feeder, which pulls every card with asyncio.to_thread:
+    # each page may be fetched on another thread, here always a new one
+    iterator = iter(iter_cards("race=Dragon", page_size=10))
+    cards = []
+    while True:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            card = executor.submit(next, iterator, None).result()
+        if card is None:
+            break
+        cards.append(card)
+
+    assert len(cards) == 25
+
+
+def test_max_cards_stops_paging(tmp_path, monkeypatch):
+    build_local_db(tmp_path, monkeypatch)
+
+    assert len(list(iter_cards("race=Dragon", page_size=10, max_cards=12))) == 12
+
+
+def test_unsupported_query_falls_back_to_the_api(tmp_path, monkeypatch):
+    build_local_db(tmp_path, monkeypatch)
+    server, base_url = serve()
+    try:
+        # the snapshot has no format data, so this must not turn into an unfiltered local search
+        cards = list(iter_cards("format=goat", page_size=10, max_cards=3, api_url=f"{base_url}/api/v7/cardinfo.php"))
+    finally:
+        server.shutdown()
+
+    assert [card["name"] for card in cards] == ["Stub Card 0", "Stub Card 1", "Stub Card 2"]
+
+
+def test_search_without_results_is_empty():
+    # the API answers offset 0 of a search without results with a 400 "no card matching"
+    server, base_url = serve(handler=type("EmptyStubHandler", (StubHandler,), {"total_cards": 0}))
+    try:
+        pages = list(iter_card_pages("fname=nothing", page_size=10, api_url=f"{base_url}/api/v7/cardinfo.php",
+                                     use_local=False))
+    finally:
+        server.shutdown()
+
+    assert pages == []
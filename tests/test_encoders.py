@@ -0,0 +1,49 @@
+import encoders
+
+
+def probed(monkeypatch, available, throughput):
+    monkeypatch.setattr(encoders, "_probe", {"ffmpeg": "test", "available": available, "throughput": throughput})
+
+
+def test_fastest_measured_encoder_wins(monkeypatch):
+    probed(monkeypatch, ["h264_nvenc", "libx264"], {"fast": {"h264_nvenc": 120.0, "libx264": 300.0}})
+    assert encoders.select_encoder("fast")[0] == "libx264"
+
+
+def test_unmeasured_encoder_keeps_its_preference(monkeypatch):
+    # a GPU encoder that became usable after libx264 was benchmarked
+    probed(monkeypatch, ["h264_nvenc", "libx264"], {"fast": {"libx264": 300.0}})
+    assert encoders.select_encoder("fast")[0] == "h264_nvenc"
+
+
+def test_measured_encoder_beats_a_less_preferred_unmeasured_one(monkeypatch):
+    probed(monkeypatch, ["h264_qsv", "libx264", "libopenh264"], {"fast": {"h264_qsv": 200.0, "libx264": 100.0}})
+    assert encoders.select_encoder("fast")[0] == "h264_qsv"
+
+
+def test_failed_benchmark_is_not_picked(monkeypatch):
+    probed(monkeypatch, ["h264_nvenc", "libx264"], {"balanced": {"h264_nvenc": 0.0, "libx264": 90.0}})
+    assert encoders.select_encoder("balanced") == ("libx264", encoders.PROFILES["balanced"]["libx264"])
+
+
+def test_cache_from_another_host_is_probed_again(monkeypatch, tmp_path):
+    cache_path = str(tmp_path / "encoders.json")
+    # a GPU node's result in a working directory shared with this CPU-only node
+    encoders.save_cache({"ffmpeg": "ffmpeg 6.1", "host": "gpu-node", "available": ["h264_nvenc", "libx264"],
+                         "throughput": {}}, cache_path)
+    monkeypatch.setattr(encoders, "_probe", None)
+    monkeypatch.setattr(encoders, "ffmpeg_version", lambda ffmpeg: "ffmpeg 6.1")
+    monkeypatch.setattr(encoders, "listed_encoders", lambda ffmpeg: {"h264_nvenc", "libx264"})
+    monkeypatch.setattr(encoders, "encoder_works", lambda name, ffmpeg: name == "libx264")
+
+    data = encoders.probe(cache_path=cache_path)
+
+    assert data["available"] == ["libx264"]
+    assert data["host"] == encoders.HOST
+    assert encoders.load_cache(cache_path)["host"] == encoders.HOST
+
+
+def test_hardware_encoders_have_a_session_limit():
+    assert encoders.session_limit("h264_nvenc") == encoders.HARDWARE_SESSIONS
+    assert encoders.session_limit("h264_qsv") == encoders.HARDWARE_SESSIONS
+    assert encoders.session_limit("libx264") is None
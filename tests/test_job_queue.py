@@ -0,0 +1,18 @@
+from job_queue import JobQueue, render_job, run_worker
+
+
+def test_failed_job_stores_the_traceback(tmp_path):
+    queue_path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(queue_path)
+    # no "desc", so the render itself fails before anything is fetched
+    card = {"id": 1, "name": "Broken Card", "type": "Spell Card", "humanReadableCardType": "Normal Spell",
+            "card_images": [{"image_url": "http://example.invalid/1.jpg"}]}
+    queue.add("render", "1", {"card": card, "with_short": True, "short_dir": str(tmp_path)}, max_attempts=1)
+
+    run_worker(queue_path, kinds=("render",), drain=True, poll=0, retry_delay=0, handlers={"render": render_job},
+               worker="test")
+
+    error, = queue.conn.execute("SELECT error FROM jobs WHERE state = 'failed'").fetchone()
+    queue.close()
+    assert error.startswith("Traceback")
+    assert error.strip().splitlines()[-1] == "KeyError: 'desc'"
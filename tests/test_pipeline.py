@@ -0,0 +1,11 @@
+import pipeline
+from stub_services import stub_card
+
+
+def test_failed_render_returns_its_error():
+    card = stub_card(0)
+    del card["desc"]
+    job = {"card": card, "script": "", "audio_path": None, "with_short": False, "short_dir": None,
+           "tts_backend": "elevenlabs"}
+
+    assert pipeline.render_card(job) == (False, None, None, "KeyError: 'desc'")
@@ -0,0 +1,78 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import scheduler
+from scheduler import Scheduler, measured_call, private_mb
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler.time, "perf_counter", clock)
+    return clock
+
+
+def run_jobs(sched, clock, count, peak_mb, threads=2.0):
+    """Finishes `count` jobs with the given usage, one per simulated second, keeping the scheduler full"""
+    for _ in range(count):
+        while sched.can_admit():
+            sched.started()
+        clock.now += 1.0
+        sched.finished({"seconds": 1.0, "threads": threads, "peak_mb": peak_mb})
+
+
+def test_limit_follows_cores_and_memory(clock):
+    sched = Scheduler("render", cores=8, memory_mb=4000, threads_per_job=2, mb_per_job=500, max_jobs=7)
+    assert sched.limit == 4
+
+    # a job that needs half the memory budget caps it at two
+    run_jobs(sched, clock, 1, peak_mb=2000)
+    assert sched.limit == 2
+    assert sched.decisions[-1]["reason"] == "measured threads/memory per job exceed the budget"
+
+
+def test_limit_recovers_after_a_spike(clock):
+    sched = Scheduler("render", cores=8, memory_mb=4000, threads_per_job=2, mb_per_job=500, max_jobs=7)
+    run_jobs(sched, clock, 1, peak_mb=3000)
+    assert sched.limit == 1
+
+    # the estimate decays back once jobs use little memory again
+    run_jobs(sched, clock, 40, peak_mb=300)
+    assert sched.mb_per_job < 1000
+    assert sched.limit == 4
+
+
+def test_unknown_memory_keeps_the_estimate(clock):
+    sched = Scheduler("render", cores=8, memory_mb=4000, threads_per_job=2, mb_per_job=500, max_jobs=7)
+    run_jobs(sched, clock, 4, peak_mb=None)
+    assert sched.mb_per_job == 500
+
+
+@pytest.mark.skipif(private_mb(os.getpid()) is None, reason="private memory can't be read on this platform")
+def test_measured_call_counts_private_memory_only(tmp_path):
+    # a file-backed array like the background store, already mapped by the worker
+    path = str(tmp_path / "frames.npy")
+    np.save(path, np.ones((200, 1024, 1024), dtype=np.uint8))
+    frames = np.load(path, mmap_mode='r')
+
+    def job():
+        frames.sum()
+        buffer = np.ones(64 * 1024 * 1024, dtype=np.uint8)
+        # memory is sampled, hold it as long as a short render would
+        time.sleep(0.6)
+        return int(buffer[-1])
+
+    for _ in range(2):
+        _, usage = measured_call(job)
+        assert 50 < usage["peak_mb"] < 150
@@ -0,0 +1,14 @@
+from segment_render import segment_ranges
+
+
+def test_ranges_cover_every_frame_once():
+    ranges = segment_ranges(10, 3)
+    assert ranges == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_more_segments_than_frames():
+    assert segment_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_no_frames_gives_no_ranges():
+    assert segment_ranges(0, 4) == []